@@ -0,0 +1,114 @@
+import math
+import threading
+import time
+from config import (
+    ANALOG_MOUSE_RATE,
+    ANALOG_MOUSE_GAIN,
+    ANALOG_MOUSE_DEAD_ZONE,
+    ANALOG_MOUSE_EXPONENT,
+    ANALOG_MOUSE_SMOOTHING,
+    ANALOG_MOUSE_TILT_RANGE
+)
+from movement_utils import X, Y, VISIBILITY, calculate_head_tilt
+
+RIGHT_SHOULDER, RIGHT_WRIST, RIGHT_HIP = 12, 16, 24
+
+# Gestures made with the head tilt that steers the cursor, they are left out
+# while the analog mouse runs so steering does not also tap their keys
+STEERING_GESTURES = ("tilt_left", "tilt_right")
+
+
+def analog_inputs(landmarks):
+    """Horizontal and vertical deflection in [-1, 1] from head tilt and right wrist height.
+
+    Tilting the head left moves left. A wrist at shoulder height holds the
+    cursor still, above moves up and below moves down. A wrist hanging near
+    the hip counts as resting, so a relaxed arm does not drag the cursor.
+    """
+    if landmarks is None:
+        return 0.0, 0.0
+
+    horizontal = -calculate_head_tilt(landmarks) / ANALOG_MOUSE_TILT_RANGE
+
+    vertical = 0.0
+    torso = landmarks[RIGHT_HIP, Y] - landmarks[RIGHT_SHOULDER, Y]
+    if landmarks[RIGHT_WRIST, VISIBILITY] > 0.5 and torso > 0:
+        vertical = (landmarks[RIGHT_WRIST, Y] - landmarks[RIGHT_SHOULDER, Y]) / torso
+        if vertical > 0.8:
+            vertical = 0.0
+
+    return max(-1.0, min(1.0, horizontal)), max(-1.0, min(1.0, float(vertical)))
+
+
+def response_curve(deflection, gain=ANALOG_MOUSE_GAIN, dead_zone=ANALOG_MOUSE_DEAD_ZONE,
+                   exponent=ANALOG_MOUSE_EXPONENT):
+    """Map a deflection in [-1, 1] to a cursor speed in pixels per second"""
+    magnitude = abs(deflection)
+    if magnitude <= dead_zone:
+        return 0.0
+    scaled = (magnitude - dead_zone) / (1.0 - dead_zone)
+    return math.copysign(gain * scaled ** exponent, deflection)
+
+
+class AnalogMouse:
+    """Moves the cursor from its own thread at a fixed rate, independent of the camera frame rate.
+
+    update() sets a target velocity from each new pose, the thread eases the
+    actual velocity towards it every tick, so motion stays smooth between pose
+    updates. Sub-pixel remainders carry over to the next tick.
+    """
+
+    def __init__(self, rate=ANALOG_MOUSE_RATE, smoothing=ANALOG_MOUSE_SMOOTHING, move=None):
+        if move is None:
+            from input_controller import move_mouse_by
+            move = move_mouse_by
+        self.move = move
+        self.interval = 1.0 / rate
+        self.smoothing = smoothing
+        self.target = (0.0, 0.0)  # Pixels per second, replaced as a whole so the thread never sees half an update
+        self.ticks = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="analog-mouse", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join(timeout=1.0)
+
+    def update(self, landmarks):
+        """Set the target velocity from a frame's landmarks, None stops the cursor"""
+        horizontal, vertical = analog_inputs(landmarks)
+        self.target = (response_curve(horizontal), response_curve(vertical))
+
+    def _run(self):
+        velocity_x = velocity_y = 0.0
+        remainder_x = remainder_y = 0.0
+        last = time.perf_counter()
+        next_tick = last + self.interval
+
+        while not self._stop_event.is_set():
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            now = time.perf_counter()
+            dt = now - last
+            last = now
+            next_tick += self.interval
+            if next_tick < now:  # Fell behind, do not try to catch up with a burst of ticks
+                next_tick = now + self.interval
+
+            target_x, target_y = self.target
+            ease = 1.0 - math.exp(-dt / self.smoothing) if self.smoothing > 0 else 1.0
+            velocity_x += (target_x - velocity_x) * ease
+            velocity_y += (target_y - velocity_y) * ease
+
+            remainder_x += velocity_x * dt
+            remainder_y += velocity_y * dt
+            step_x, step_y = int(remainder_x), int(remainder_y)
+            if step_x or step_y:
+                remainder_x -= step_x
+                remainder_y -= step_y
+                self.move(step_x, step_y)
+            self.ticks += 1
@@ -0,0 +1,223 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import numpy as np
+from movement_handlers import COMBOS, GESTURES, GestureEngine
+from movement_utils import NUM_LANDMARKS, LANDMARK_FIELDS, X, Y, VISIBILITY
+from replay import EventSink
+
+BASELINE_FILE = 'benchmark_baseline.json'
+FRAME_INTERVAL = 1 / 30  # Synthetic frames are spaced like a 30 fps camera
+HOLD_FRAMES = 12  # Frames each gesture is held for, 0.4 s
+IDLE_FRAMES = 12  # Frames of standing still between gestures
+REPEATS = 2  # Times each gesture is performed per sequence
+NOISE = 0.002  # Landmark jitter, roughly what the full model shows when standing still
+
+# Standing still facing the camera, arms hanging, in normalized image coordinates.
+# Only the landmarks the gestures look at matter, the rest sit near the nose.
+NEUTRAL = {
+    0: (0.50, 0.20),  # nose
+    1: (0.53, 0.18),  # left eye inner
+    4: (0.47, 0.18),  # right eye inner
+    11: (0.60, 0.35), 12: (0.40, 0.35),  # shoulders
+    13: (0.62, 0.50), 14: (0.38, 0.50),  # elbows
+    15: (0.63, 0.65), 16: (0.37, 0.65),  # wrists
+    23: (0.56, 0.62), 24: (0.44, 0.62),  # hips
+    25: (0.55, 0.78), 26: (0.45, 0.78),  # knees
+}
+
+# The landmarks that move for each gesture, everything else stays in NEUTRAL
+POSES = {
+    "left_arm_bend": {13: (0.65, 0.50), 15: (0.60, 0.40)},
+    "right_arm_bend": {14: (0.35, 0.50), 16: (0.40, 0.40)},
+    "tilt_left": "tilt_left",
+    "tilt_right": "tilt_right",
+    "arm_raised": {13: (0.66, 0.28), 15: (0.68, 0.15)},
+    "arm_lowered": {13: (0.66, 0.28), 15: (0.68, 0.15), 14: (0.34, 0.28), 16: (0.32, 0.15)},
+    "jump": {26: (0.45, 0.55)},
+    "left_knee_raise": {25: (0.55, 0.55)},
+    "knee_clap": {25: (0.51, 0.78), 26: (0.49, 0.78)},
+    "left_arm_flick": {15: (0.83, 0.65)},
+    "right_arm_flick": {16: (0.17, 0.65)},
+    "hop": "hop",
+}
+
+# (pose, frames) making up one performance of a gesture, None standing still.
+# Gestures not listed are held for HOLD_FRAMES and released for IDLE_FRAMES.
+STEPS = {
+    "double_jump": [("hop", 6), (None, 6), ("hop", 6), (None, 30)],
+    "double_flick": [("left_arm_flick", 6), (None, 6), ("right_arm_flick", 6), (None, 30)],
+}
+
+# What each gesture emits on its own over its sequence. arm_lowered holds
+# while standing still, so its sequence raises both arms and it emits the
+# other way around. knee_clap is a hold gesture that repeats every cooldown.
+# A flick fires both when the arm swings out and when it swings back.
+PRESS_RELEASE = [("press", "release")] * REPEATS
+EXPECTED = {
+    "left_arm_bend": PRESS_RELEASE,
+    "right_arm_bend": PRESS_RELEASE,
+    "tilt_left": PRESS_RELEASE,
+    "tilt_right": PRESS_RELEASE,
+    "arm_raised": PRESS_RELEASE,
+    "arm_lowered": [("press",)] + [("release", "press")] * REPEATS,
+    "jump": PRESS_RELEASE,
+    "left_knee_raise": PRESS_RELEASE,
+    "knee_clap": [("press", "press")] * REPEATS,
+    "left_arm_flick": [("press", "release", "press", "release")] * REPEATS,
+    "right_arm_flick": [("press", "release", "press", "release")] * REPEATS,
+    "hop": PRESS_RELEASE,
+    "double_jump": PRESS_RELEASE,
+    "double_flick": PRESS_RELEASE,
+}
+
+
+def neutral_pose():
+    landmarks = np.zeros((NUM_LANDMARKS, LANDMARK_FIELDS), dtype=np.float32)
+    landmarks[:, X], landmarks[:, Y] = NEUTRAL[0]
+    for index, (x, y) in NEUTRAL.items():
+        landmarks[index, X], landmarks[index, Y] = x, y
+    landmarks[:, VISIBILITY] = 0.99
+    return landmarks
+
+
+def gesture_pose(name):
+    landmarks = neutral_pose()
+    pose = POSES[name]
+    if pose in ("tilt_left", "tilt_right"):
+        # Turn the line between the eyes 40 degrees about its middle
+        angle = np.radians(40 if pose == "tilt_left" else -40)
+        center = (landmarks[1, :2] + landmarks[4, :2]) / 2
+        half = 0.03 * np.array([np.cos(angle), np.sin(angle)])
+        landmarks[1, :2] = center + half
+        landmarks[4, :2] = center - half
+    elif pose == "hop":
+        landmarks[:, Y] -= 0.1  # The whole body a tenth of the frame higher
+    else:
+        for index, (x, y) in pose.items():
+            landmarks[index, X], landmarks[index, Y] = x, y
+    return landmarks
+
+
+def gesture_sequence(name, rng):
+    """Landmark frames performing a gesture or combo REPEATS times with idle frames around it"""
+    neutral = neutral_pose()
+    steps = STEPS.get(name, [(name, HOLD_FRAMES), (None, IDLE_FRAMES)])
+    frames = [neutral] * IDLE_FRAMES
+    for _ in range(REPEATS):
+        for pose, count in steps:
+            frames += [neutral if pose is None else gesture_pose(pose)] * count
+    return jitter(np.stack(frames), rng)
+
+
+def idle_sequence(rng, count=300):
+    """Standing still for count frames, nothing but noise"""
+    return jitter(np.repeat(neutral_pose()[None], count, axis=0), rng)
+
+
+def jitter(frames, rng):
+    frames = frames.copy()
+    frames[:, :, :2] += rng.normal(0, NOISE, frames[:, :, :2].shape).astype(np.float32)
+    return frames
+
+
+def time_engine(frames, names):
+    """Feed frames through a fresh engine with only the named gestures on.
+
+    Returns (events, seconds per frame). Input goes to an EventSink, so
+    nothing reaches pynput.
+    """
+    keybindings = {gesture.name: gesture.name for gesture in GESTURES + COMBOS}
+    toggles = {name: True for name in names}
+    times = np.arange(len(frames)) * FRAME_INTERVAL
+    sink = EventSink()
+    engine = GestureEngine(keybindings, toggles, emit=sink)
+    start = time.perf_counter()
+    for landmarks, capture_time in zip(frames, times):
+        engine.update(landmarks, capture_time)
+    return sink.events, (time.perf_counter() - start) / len(frames)
+
+
+def expected_events(name):
+    return [(name, action) for group in EXPECTED[name] for action in group]
+
+
+def build_cases(seed=0):
+    """{case: (frames, enabled gestures, expected (key, action) list or None)}"""
+    rng = np.random.default_rng(seed)
+    names = [gesture.name for gesture in GESTURES + COMBOS]
+    cases = {name: (gesture_sequence(name, rng), [name], expected_events(name)) for name in names}
+    # Standing still with everything on must only report the arms as lowered
+    idle = idle_sequence(rng)
+    full = np.concatenate([idle] + [frames for frames, _, _ in cases.values()])
+    cases["idle"] = (idle, names, [("arm_lowered", "press")])
+    cases["full pass"] = (full, names, None)
+    return cases
+
+
+def run(rounds, seed=0):
+    """Time every gesture on its own, standing still and the full pass.
+
+    Returns ({case: frames/s}, [problems]). Rounds go round-robin over the
+    cases and the best round counts, so a burst of load on the machine slows
+    down one round of every case instead of every round of one case.
+    """
+    cases = build_cases(seed)
+    best = {case: float("inf") for case in cases}
+    problems = []
+    for i in range(rounds):
+        for case, (frames, names, expected) in cases.items():
+            events, per_frame = time_engine(frames, names)
+            best[case] = min(best[case], per_frame)
+            got = [(key, action) for _, key, action in events]
+            if i == 0 and expected is not None and got != expected:
+                problems.append(f"{case}: expected {expected}, got {got}")
+    return {case: 1 / per_frame for case, per_frame in best.items()}, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gesture evaluation on synthetic pose sequences")
+    parser.add_argument("--rounds", type=int, default=30, help="times each sequence is timed, the best counts")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help=f"stored results (default: {BASELINE_FILE})")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="fail when a case is this fraction slower than the baseline (default: 0.3)")
+    args = parser.parse_args()
+
+    fps, problems = run(args.rounds)
+
+    try:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = None
+
+    print(f"{'case':<16} {'us/frame':>9} {'frames/s':>10} {'baseline':>10}")
+    for case, value in fps.items():
+        stored = baseline["fps"].get(case) if baseline else None
+        line = f"{case:<16} {1e6 / value:>9.1f} {value:>10.0f}"
+        if stored:
+            line += f" {stored:>10.0f} {(value / stored - 1) * 100:+6.1f}%"
+            if value < stored * (1 - args.tolerance):
+                problems.append(f"{case}: {value:.0f} frames/s is below the baseline of {stored:.0f}")
+        print(line)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({"machine": platform.platform(), "processor": platform.machine(),
+                       "python": platform.python_version(), "fps": {k: round(v) for k, v in fps.items()}},
+                      f, indent=4)
+        print(f"saved baseline to {args.baseline}")
+    elif baseline and baseline.get("machine") != platform.platform():
+        print(f"note: baseline was recorded on {baseline.get('machine')}, re-record it with --save-baseline")
+
+    for problem in problems:
+        print(f"FAIL {problem}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from config import CAPTURE_WIDTH, CAPTURE_HEIGHT, CAPTURE_FPS, CAPTURE_FOURCC
+
+
+class Camera:
+    """VideoCapture wrapper that reads into reused buffers and asks the device for low latency"""
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.shape = None  # Frame shape, known after the first read
+        self._buffer = None
+        self.reads = 0
+        self.reallocations = 0  # Reads where OpenCV could not fill the given buffer
+        self._min_interval = 0.0
+        self._last_read = 0.0
+
+    def configure(self, width=CAPTURE_WIDTH, height=CAPTURE_HEIGHT, fps=CAPTURE_FPS,
+                  fourcc=CAPTURE_FOURCC, buffer_size=1):
+        """Request a pixel format, resolution, frame rate and driver queue length.
+
+        MJPG lets USB webcams deliver full frame rates at higher resolutions,
+        and a one-frame driver queue means a read returns the newest frame
+        instead of one that waited in the queue. The FOURCC goes first since
+        V4L2 picks the available sizes per format. Unset values are left alone.
+        """
+        if fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        if width:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps:
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+        if buffer_size:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
+    def settings(self):
+        """What the device actually agreed to, which may differ from what was asked"""
+        fourcc = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        return {
+            "backend": self.cap.getBackendName(),
+            "fourcc": "".join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4)) if fourcc else "?",
+            "width": int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": self.cap.get(cv2.CAP_PROP_FPS),
+            "buffer_size": int(self.cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+        }
+
+    def limit_fps(self, fps):
+        """Hand out at most about fps frames a second, even from a camera that ignored the requested rate.
+
+        Frames arriving too soon are taken with grab(), which skips decoding them.
+        """
+        self._min_interval = 0.8 / fps if fps else 0.0  # Slack for frames arriving a little early
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self, out=None):
+        """Read a frame into out, or into the camera's own reused buffer. Returns (ret, frame)"""
+        if self._min_interval:
+            while time.perf_counter() - self._last_read < self._min_interval:
+                if not self.cap.grab():
+                    return False, None
+
+        own = out is None
+        if own:
+            out = self._buffer
+        ret, frame = self.cap.read(image=out) if out is not None else self.cap.read()
+        if not ret:
+            return False, None
+
+        self.reads += 1
+        self._last_read = time.perf_counter()
+        if frame is not out:
+            # First frame, or OpenCV allocated because the frame size changed
+            if out is not None:
+                self.reallocations += 1
+            self.shape = frame.shape
+            if own:
+                self._buffer = frame
+        return True, frame
+
+    def release(self):
+        self.cap.release()
+
+
+def benchmark(camera, frames):
+    """Allocations per frame for plain cap.read() + cvtColor against the reused-buffer path"""
+    ret, frame = camera.read()
+    if not ret:
+        raise RuntimeError("camera returned no frame")
+    rgb = np.empty_like(frame)
+
+    def plain():
+        _, image = camera.cap.read()
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    def reused():
+        _, image = camera.read()
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=rgb)
+
+    results = {}
+    for name, step in (("cap.read + cvtColor", plain), ("reused buffers", reused)):
+        step()  # Let both paths settle before measuring
+        tracemalloc.start()
+        start_snapshot = tracemalloc.take_snapshot()
+        start = time.perf_counter()
+        for _ in range(frames):
+            step()
+        elapsed = time.perf_counter() - start
+        stats = tracemalloc.take_snapshot().compare_to(start_snapshot, "lineno")
+        tracemalloc.stop()
+        allocations = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+        allocated = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+        results[name] = (allocations, allocated, elapsed)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report negotiated camera settings and benchmark frame allocations")
+    parser.add_argument("--camera", type=int, default=None, metavar="INDEX", help="camera to use")
+    parser.add_argument("--frames", type=int, default=300, help="frames per benchmark run")
+    args = parser.parse_args()
+
+    from startup import open_camera
+    camera, info = open_camera(args.camera)
+    if not camera.isOpened():
+        raise SystemExit(f"could not open camera {info['index']}")
+    print(", ".join(f"{key} {value}" for key, value in info.items()))
+
+    # tracemalloc only sees the allocations NumPy makes, which is where frames live
+    for name, (allocations, allocated, elapsed) in benchmark(camera, args.frames).items():
+        print(
+            f"{name:<20} {allocations / args.frames:6.2f} allocations/frame, "
+            f"{allocated / args.frames / 1024:8.1f} KiB/frame retained growth, "
+            f"{args.frames / elapsed:5.1f} frames/s"
+        )
+    camera.release()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import time
+import cv2
+import numpy as np
+from config import POSE_MODEL, ROI_PADDING
+from movement_utils import X, Y, VISIBILITY
+from pose_detection import BACKENDS, MODEL_COMPLEXITY, PoseDetector
+
+
+def run_backend(path, backend, model, realtime, roi):
+    """Feed a video through one backend, returns (results by frame, latencies, frames fed, seconds, frame size)"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise SystemExit(f"could not open {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    detector = PoseDetector(roi_padding=ROI_PADDING if roi else None, backend=backend, model=model)
+    detector.warm_up(width, height)
+
+    results = {}
+    latencies = []
+    submitted = []
+    started_at = time.perf_counter()
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if realtime:
+            # Hand frames over no faster than a camera at the video's frame rate would
+            delay = started_at + len(submitted) / fps - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        submitted.append(time.perf_counter())
+        landmarks = detector.process_frame(frame)
+        if detector.fresh:
+            latencies.append(time.perf_counter() - submitted[detector.result_frame])
+            results[detector.result_frame] = None if landmarks is None else landmarks.copy()
+    elapsed = time.perf_counter() - started_at
+
+    detector.close()
+    cap.release()
+    return results, np.array(latencies), len(submitted), elapsed, (width, height)
+
+
+def mean_pixel_error(results, reference, size):
+    """Mean distance in pixels between landmarks both runs saw with visibility above 0.5"""
+    errors = []
+    for frame_id, landmarks in results.items():
+        expected = reference.get(frame_id)
+        if landmarks is None or expected is None:
+            continue
+        visible = (landmarks[:, VISIBILITY] > 0.5) & (expected[:, VISIBILITY] > 0.5)
+        delta = (landmarks[visible][:, [X, Y]] - expected[visible][:, [X, Y]]) * size
+        errors.extend(np.hypot(delta[:, 0], delta[:, 1]))
+    return float(np.mean(errors)) if errors else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pose backends side by side on a recorded video")
+    parser.add_argument("video", help="video file, e.g. a screen recording of yourself playing")
+    parser.add_argument("--backends", nargs="+", choices=tuple(BACKENDS), default=list(BACKENDS))
+    parser.add_argument("--model", choices=tuple(MODEL_COMPLEXITY), default=POSE_MODEL)
+    parser.add_argument("--realtime", action="store_true",
+                        help="feed frames at the video's frame rate instead of as fast as possible")
+    parser.add_argument("--no-roi", action="store_true", help="always give the model the whole frame")
+    args = parser.parse_args()
+
+    runs = {}
+    for backend in args.backends:
+        print(f"running {backend}...")
+        runs[backend] = run_backend(args.video, backend, args.model, args.realtime, not args.no_roi)
+
+    reference_name = args.backends[0]
+    reference = runs[reference_name][0]
+    print(f"{'backend':<10} {'fed':>6} {'results':>8} {'results/s':>10} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'poses':>6}  error vs {reference_name}")
+    for backend, (results, latencies, fed, elapsed, size) in runs.items():
+        p50, p95, p99 = np.percentile(latencies, (50, 95, 99)) * 1000 if len(latencies) else (0.0, 0.0, 0.0)
+        poses = sum(landmarks is not None for landmarks in results.values())
+        error = "" if backend == reference_name else f"{mean_pixel_error(results, reference, size):.1f} px"
+        print(f"{backend:<10} {fed:>6} {len(results):>8} {len(results) / elapsed:>10.1f} "
+              f"{p50:>7.1f} {p95:>7.1f} {p99:>7.1f} {poses:>6}  {error}")
+
+
+if __name__ == "__main__":
+    main()
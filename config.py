@@ -1,19 +1,53 @@
-from collections import defaultdict
 import json
+import os
+import time
 
 # Global configuration
-CAMERA_INDEX = 1  # Mac's built-in webcam
+CAMERA_INDEX = None  # None finds a working camera and remembers it, 1 is the Mac's built-in webcam
+CAMERA_CACHE_FILE = 'camera_cache.json'  # Camera index and format that worked last time
+CAMERA_PROBE_LIMIT = 5  # Camera indices tried when looking for a working one
+CAPTURE_WIDTH = 640  # Resolution requested from the camera, None keeps the camera's default
+CAPTURE_HEIGHT = 480
+CAPTURE_FPS = 30  # Frame rate requested from the camera, None keeps the camera's default
+CAPTURE_FOURCC = 'MJPG'  # Pixel format requested from the camera, None keeps the camera's default
 COOLDOWN = 0.3  # 0.3 seconds cooldown
 HEAD_TILT_THRESHOLD = 30
+HISTORY_FRAMES = 32  # Landmark frames kept for velocity and combo gestures, about a second at 30 fps
+VELOCITY_CUTOFF = 10.0  # Cutoff in Hz for the joint velocity and acceleration estimates
+FLICK_SPEED = 2.5  # Wrist speed in frame widths per second that counts as an arm flick
+HOP_SPEED = 0.6  # Upward hip speed in frame heights per second that counts as a hop
+COMBO_WINDOW = 0.8  # Seconds within which all steps of a combo gesture have to happen
+POSE_BACKEND = 'solutions'  # 'solutions' for mp.solutions.pose, 'tasks' for the Tasks PoseLandmarker
+POSE_MODEL = 'full'  # 'lite', 'full' or 'heavy'
+POSE_MODEL_FILES = {  # Model files for the 'tasks' backend
+    'lite': 'models/pose_landmarker_lite.task',
+    'full': 'models/pose_landmarker_full.task',
+    'heavy': 'models/pose_landmarker_heavy.task',
+}
+INFERENCE_SIZE = 320  # Longest side in pixels of the image given to the pose model, 0 to disable downscaling
+ROI_PADDING = 0.2  # Padding around the player's bounding box as a fraction of its size
+MOTION_THRESHOLD = 8  # Gray levels a thumbnail pixel must change by for the motion gate to run inference
+MOTION_REFRESH_FRAMES = 30  # Frames the motion gate may skip in a row before inference runs anyway
+CPU_PROFILE = 'default'  # 'default', 'balanced' or 'low-power', see cpu_budget.py
+TARGET_FPS = 30  # Frame rate the adaptive quality governor aims to sustain
+LATENCY_BUDGET_MS = 100  # Longest acceptable capture-to-gesture latency for the governor
+FILTER_MIN_CUTOFF = 1.5  # Landmark filter cutoff in Hz when still, lower removes more jitter
+FILTER_BETA = 5.0  # How quickly the landmark filter cutoff rises with speed, higher means less lag
+FILTER_D_CUTOFF = 1.0  # Cutoff in Hz for the landmark velocity estimate
+ANALOG_MOUSE_RATE = 240  # Cursor updates per second in analog mouse mode
+ANALOG_MOUSE_GAIN = 1200  # Cursor speed in pixels per second at full deflection
+ANALOG_MOUSE_DEAD_ZONE = 0.15  # Deflection (0-1) below which the cursor stays still
+ANALOG_MOUSE_EXPONENT = 2.0  # Acceleration curve, 1 is linear, higher gives finer control near the center
+ANALOG_MOUSE_SMOOTHING = 0.08  # Seconds for the cursor speed to follow a new pose
+ANALOG_MOUSE_TILT_RANGE = 40  # Head tilt in degrees that gives full horizontal deflection
 
-# Initialize timing and state tracking
-last_action_time = defaultdict(float)  # Store last action time for each movement
-previous_states = defaultdict(bool)  # Store previous states of movements
+KEYBINDINGS_FILE = 'keybindings.json'
+TOGGLES_FILE = 'toggles.json'
 
-def load_keybindings():
+def load_keybindings(path=KEYBINDINGS_FILE):
     """Load keybindings from file, uses the same format as config_gui.py"""
     try:
-        with open('keybindings.json', 'r') as f:
+        with open(path, 'r') as f:
             return json.load(f)
     except FileNotFoundError:
         # Using the same defaults as config_gui.py
@@ -29,12 +63,47 @@ def load_keybindings():
             "arm_lowered": "mouse_down"
         }
 
-def load_toggles():
+def load_toggles(path=TOGGLES_FILE, keybindings_path=KEYBINDINGS_FILE):
     """Load movement toggles from file, uses the same format as config_gui.py"""
     try:
-        with open('toggles.json', 'r') as f:
+        with open(path, 'r') as f:
             return json.load(f)
     except FileNotFoundError:
         # Default to all movements enabled, matching config_gui.py
-        default_bindings = load_keybindings()
-        return {key: True for key in default_bindings.keys()}
\ No newline at end of file
+        default_bindings = load_keybindings(keybindings_path)
+        return {key: True for key in default_bindings.keys()}
+
+class ConfigWatcher:
+    """Notices edits to the keybindings and toggles files with a rate-limited mtime check"""
+
+    def __init__(self, paths=(KEYBINDINGS_FILE, TOGGLES_FILE), interval=0.5):
+        self.paths = paths
+        self.interval = interval
+        self._next_check = time.monotonic() + interval
+        self._mtimes = self._read_mtimes()
+
+    def _read_mtimes(self):
+        mtimes = []
+        for path in self.paths:
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return mtimes
+
+    def changed(self):
+        """True once after any of the files was created, modified or removed"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.interval
+
+        mtimes = self._read_mtimes()
+        if mtimes == self._mtimes:
+            return False
+        self._mtimes = mtimes
+        return True
+
+    def retry(self):
+        """Report the files as changed again on the next check, e.g. after reading a half-written file"""
+        self._mtimes = None
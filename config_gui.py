@@ -2,6 +2,111 @@ import tkinter as tk
 from tkinter import ttk
 import json
 import os
+import queue
+import threading
+import time
+
+
+class GestureTester(threading.Thread):
+    """Runs the camera, pose model and gesture engine off the Tk thread for the test panel.
+
+    Input actions go to a list instead of pynput, so nothing is pressed while
+    testing. Every frame a snapshot is offered to `updates`; when the GUI has
+    not taken the previous one yet it is replaced (its events are carried
+    over), so the worker never waits on the GUI and the GUI always shows the
+    newest frame.
+    """
+
+    def __init__(self, keybindings, toggles, camera=None):
+        super().__init__(name="gesture-tester", daemon=True)
+        self.camera = camera
+        self.updates = queue.Queue(maxsize=1)
+        self.stop_event = threading.Event()
+        self._pending_bindings = (keybindings, toggles)
+        self._events = []
+
+    def set_bindings(self, keybindings, toggles):
+        """Use new bindings and toggles from the next frame on"""
+        self._pending_bindings = (keybindings, toggles)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _emit(self, action_key, action_type, capture_time=None):
+        self._events.append(f"{action_type} {action_key}")
+
+    def _publish(self, update):
+        try:
+            self.updates.put_nowait(update)
+        except queue.Full:
+            try:
+                # Keep the events of the snapshot being replaced, only the rest goes stale
+                update["events"] = self.updates.get_nowait().get("events", []) + update.get("events", [])
+            except queue.Empty:
+                pass
+            self.updates.put_nowait(update)
+
+    def run(self):
+        try:
+            self._run()
+        except Exception as e:
+            self._publish({"status": f"Test stopped: {e}"})
+
+    def _run(self):
+        # Heavy imports happen here so opening the GUI stays instant
+        self._publish({"status": "Loading pose model..."})
+        from movement_handlers import GestureEngine
+        from pose_detection import PoseDetector
+        from profiler import StageProfiler
+        from startup import open_camera
+
+        profiler = StageProfiler(("read", "convert", "inference", "gestures", "frame"), window=120)
+        pose_detector = PoseDetector(profiler)
+        cap, _ = open_camera(self.camera)
+        engine = None
+        frames, summary, last_summary = 0, [], time.perf_counter()
+        frame_end = profiler.start()
+
+        try:
+            while not self.stop_event.is_set() and cap.isOpened():
+                if self._pending_bindings is not None:
+                    keybindings, toggles = self._pending_bindings
+                    self._pending_bindings = None
+                    engine = GestureEngine(keybindings, toggles, emit=self._emit)
+
+                start = profiler.start()
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                capture_time = time.perf_counter()
+                profiler.record("read", start)
+
+                landmarks = pose_detector.process_frame(frame)
+
+                start = profiler.start()
+                if landmarks is not None:
+                    engine.update(landmarks, capture_time)
+                profiler.record("gestures", start)
+                frame_end = profiler.record("frame", frame_end)
+                profiler.end_frame()
+                frames += 1
+
+                # Percentiles are worth recomputing a couple of times a second, not every frame
+                now = time.perf_counter()
+                if now - last_summary >= 0.5:
+                    summary = profiler.summary_lines()
+                    last_summary = now
+
+                events, self._events = self._events, []
+                self._publish({
+                    "status": f"Testing, frame {frames}" + ("" if landmarks is not None else ", no pose found"),
+                    "active": {name: engine.is_active(name) for name in engine.names},
+                    "events": events,
+                    "timings": summary,
+                })
+        finally:
+            cap.release()
+            pose_detector.close()
 
 
 class KeyBindingGUI:
@@ -19,9 +124,17 @@ class KeyBindingGUI:
             "left_knee_raise": "down",
             "knee_clap": "shift",
             "arm_raised": "mouse_up",
-            "arm_lowered": "mouse_down"
+            "arm_lowered": "mouse_down",
+            "left_arm_flick": "z",
+            "right_arm_flick": "x",
+            "hop": "up",
+            "double_jump": "space",
+            "double_flick": "shift"
         }
 
+        # Motion gestures and combos are new, they start out disabled
+        self.opt_in = {"left_arm_flick", "right_arm_flick", "hop", "double_jump", "double_flick"}
+
         # Add dropdown options for mouse and keyboard
         self.input_options = {
             "keyboard": ["left", "right", "up", "down", "space", "shift", "z", "x"],
@@ -39,7 +152,7 @@ class KeyBindingGUI:
                     self.current_bindings[key] = self.default_bindings[key]
 
         # Default toggle states (all enabled by default)
-        self.default_toggles = {key: True for key in self.default_bindings.keys()}
+        self.default_toggles = {key: key not in self.opt_in for key in self.default_bindings.keys()}
 
         # Load existing toggles or use defaults
         self.current_toggles = self.load_toggles()
@@ -51,7 +164,9 @@ class KeyBindingGUI:
                 if key not in self.current_toggles:
                     self.current_toggles[key] = self.default_toggles[key]
 
+        self.tester = None
         self.create_widgets()
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
 
     def create_widgets(self):
         # Create and pack widgets for each movement
@@ -64,7 +179,12 @@ class KeyBindingGUI:
             "left_knee_raise": "Left Knee Raise",  # Changed from "Squat" to "Left Knee Raise"
             "knee_clap": "Knee Clap",
             "arm_raised": "Arm Raised Position",
-            "arm_lowered": "Arm Lowered Position"
+            "arm_lowered": "Arm Lowered Position",
+            "left_arm_flick": "Left Arm Flick (fast swing)",
+            "right_arm_flick": "Right Arm Flick (fast swing)",
+            "hop": "Hop (hips move up fast)",
+            "double_jump": "Double Hop",
+            "double_flick": "Left Flick then Right Flick"
         }
 
         # Combine all input options for the dropdown
@@ -101,15 +221,88 @@ class KeyBindingGUI:
 
         ttk.Button(button_frame, text="Save", command=self.save_config).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Reset to Defaults", command=self.reset_to_defaults).pack(side=tk.RIGHT, padx=5)
+        self.test_button = ttk.Button(button_frame, text="Test", command=self.toggle_test)
+        self.test_button.pack(side=tk.RIGHT, padx=5)
+
+        # Test panel, shows which gestures the camera sees without pressing anything
+        self.test_panel = ttk.LabelFrame(self.root, text="Live test (no input is sent)", padding="5")
+        self.test_status = ttk.Label(self.test_panel, text="")
+        self.test_status.pack(anchor=tk.W)
+        self.gesture_labels = {}
+        for key, description in movements.items():
+            label = tk.Label(self.test_panel, text=description, anchor=tk.W, width=30)
+            label.pack(anchor=tk.W)
+            self.gesture_labels[key] = label
+        self.test_events = ttk.Label(self.test_panel, text="", font="TkFixedFont")
+        self.test_events.pack(anchor=tk.W, pady=(5, 0))
+        self.test_timings = ttk.Label(self.test_panel, text="", font="TkFixedFont", justify=tk.LEFT)
+        self.test_timings.pack(anchor=tk.W, pady=(5, 0))
+        self.recent_events = []
+
+    def read_widgets(self):
+        """Bindings and toggles as currently shown, saved or not"""
+        bindings = {key: getattr(self, f"combo_{key}").get() for key in self.default_bindings}
+        toggles = {key: getattr(self, f"toggle_{key}").get() for key in self.default_bindings}
+        return bindings, toggles
+
+    def toggle_test(self):
+        if self.tester:
+            self.tester.stop()
+            self.tester = None
+            self.test_panel.pack_forget()
+            self.test_button.config(text="Test")
+            return
+
+        bindings, toggles = self.read_widgets()
+        self.tester = GestureTester(bindings, toggles)
+        self.tested_settings = (bindings, toggles)
+        self.recent_events = []
+        self.test_panel.pack(fill=tk.X, padx=5, pady=5)
+        self.test_button.config(text="Stop Test")
+        self.tester.start()
+        self.poll_tester(self.tester)
+
+    def poll_tester(self, tester):
+        """Show the newest snapshot from the tester, runs on the Tk thread every 30 ms"""
+        if tester is not self.tester:
+            return  # Test was stopped
+
+        # Edits made while testing apply straight away, without saving
+        settings = self.read_widgets()
+        if settings != self.tested_settings:
+            tester.set_bindings(*settings)
+            self.tested_settings = settings
+
+        try:
+            update = tester.updates.get_nowait()
+        except queue.Empty:
+            update = None
+        if update:
+            self.test_status.config(text=update["status"])
+            active = update.get("active", {})
+            for key, label in self.gesture_labels.items():
+                if key not in active:
+                    label.config(bg=self.root.cget("bg"), fg="grey")
+                else:
+                    label.config(bg="pale green" if active[key] else self.root.cget("bg"), fg="black")
+            self.recent_events = (self.recent_events + update.get("events", []))[-5:]
+            self.test_events.config(text="\n".join(self.recent_events))
+            timings = update.get("timings")
+            if timings:
+                self.test_timings.config(text="\n".join(["stage       p50    p95    p99"] + timings))
+
+        self.root.after(30, self.poll_tester, tester)
+
+    def close(self):
+        if self.tester:
+            self.tester.stop()
+        self.root.destroy()
 
     def save_config(self):
         # Update current bindings and toggles from entries
-        for key in self.default_bindings.keys():
-            combo = getattr(self, f"combo_{key}")
-            self.current_bindings[key] = combo.get()
-
-            toggle_var = getattr(self, f"toggle_{key}")
-            self.current_toggles[key] = toggle_var.get()
+        bindings, toggles = self.read_widgets()
+        self.current_bindings.update(bindings)
+        self.current_toggles.update(toggles)
 
         # Save to file
         with open('keybindings.json', 'w') as f:
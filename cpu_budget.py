@@ -0,0 +1,160 @@
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# opencv_threads is passed to cv2.setNumThreads, None leaves OpenCV's default.
+# capture_cores and inference_cores are CPU indices the stage threads are
+# pinned to, negative ones count from the last allowed CPU, None pins nothing.
+# MediaPipe has no thread count setting for either API (the TFLite thread
+# pool is internal, and environment variables such as OMP_NUM_THREADS do not
+# reach it), but its worker threads inherit the affinity of the thread that
+# builds the model, so inference_cores is what caps its CPU use.
+# capture_fps throttles capture, model and motion_gate override main.py's flags.
+CpuProfile = namedtuple(
+    "CpuProfile",
+    "name opencv_threads capture_cores inference_cores capture_fps model motion_gate"
+)
+
+CPU_PROFILES = {
+    "default": CpuProfile("default", None, None, None, None, None, False),
+    "balanced": CpuProfile("balanced", 2, (-3,), (-2, -1), None, None, False),
+    "low-power": CpuProfile("low-power", 1, (-1,), (-1,), 15, "lite", True),
+}
+
+
+def resolve_cores(cores):
+    """Map profile core indices onto the CPUs this process may use, None if pinning is not possible"""
+    if not cores or not hasattr(os, "sched_setaffinity"):
+        return None
+    allowed = sorted(os.sched_getaffinity(0))
+    return {allowed[index % len(allowed)] for index in cores}
+
+
+def pin_thread(cores):
+    """Pin the calling thread to cores, threads it starts afterwards inherit the mask.
+
+    Only Linux can pin single threads; elsewhere this does nothing.
+    """
+    resolved = resolve_cores(cores)
+    if resolved is None:
+        if cores:
+            logger.info("CPU affinity is not supported on this platform, not pinning")
+        return
+    # pid 0 is the calling thread on Linux, not the whole process
+    os.sched_setaffinity(0, resolved)
+
+
+def apply_opencv_threads(profile):
+    if profile.opencv_threads is not None:
+        import cv2
+        cv2.setNumThreads(profile.opencv_threads)
+
+
+def cpu_seconds():
+    """CPU time used by this process so far, user plus system"""
+    times = os.times()
+    return times.user + times.system
+
+
+def measure(profile, camera_index, seconds):
+    """Run capture, inference and gesture evaluation under profile, returns a result dict.
+
+    Input goes to an EventSink, so nothing is pressed. Runs in its own process,
+    since thread caps and affinity cannot be undone for the next profile.
+    """
+    from config import load_keybindings, load_toggles
+    from movement_handlers import GestureEngine
+    from pipeline import PosePipeline
+    from pose_detection import MotionGate, PoseDetector
+    from replay import EventSink
+    from startup import open_camera
+
+    def build_detector():
+        pin_thread(profile.inference_cores)  # The model's threads start with this mask
+        return PoseDetector(model=profile.model or "full", motion_gate=MotionGate() if profile.motion_gate else None)
+
+    apply_opencv_threads(profile)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="model") as executor:
+        pose_detector = executor.submit(build_detector).result()
+    camera, info = open_camera(camera_index)
+    if profile.capture_fps:
+        camera.configure(width=None, height=None, fourcc=None, fps=profile.capture_fps, buffer_size=None)
+        camera.limit_fps(profile.capture_fps)
+    pose_detector.warm_up(info.get("width", 640), info.get("height", 480))
+    engine = GestureEngine(load_keybindings(), load_toggles(), emit=EventSink())
+
+    pipeline = PosePipeline(camera, pose_detector,
+                            capture_cores=profile.capture_cores, inference_cores=profile.inference_cores)
+    started_at, cpu_start = time.perf_counter(), cpu_seconds()
+    pipeline.start()
+    try:
+        for packet in pipeline.packets():
+            if packet.landmarks is not None:
+                engine.update(packet.landmarks, packet.capture_time)
+            if time.perf_counter() - started_at >= seconds:
+                break
+    finally:
+        pipeline.stop()
+    elapsed = time.perf_counter() - started_at
+    cpu = cpu_seconds() - cpu_start
+    camera.release()
+    pose_detector.close()
+
+    stats = pipeline.stats()
+    return {
+        "profile": profile.name,
+        "camera_fps": info.get("fps"),
+        "captured_fps": stats["capture"]["frames"] / elapsed,
+        "inferred_fps": stats["inference"]["frames"] / elapsed,
+        "dispatched_fps": stats["dispatch"]["frames"] / elapsed,
+        "cpu_percent": cpu / elapsed * 100,
+        "cpu_ms_per_frame": cpu / max(1, stats["dispatch"]["frames"]) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare frame rate and CPU use of the CPU profiles")
+    parser.add_argument("profiles", nargs="*", default=list(CPU_PROFILES),
+                        help=f"profiles to run, from {', '.join(CPU_PROFILES)} (default: all)")
+    parser.add_argument("--camera", type=int, default=None, metavar="INDEX", help="camera to use")
+    parser.add_argument("--seconds", type=float, default=15, help="how long to run each profile")
+    parser.add_argument("--child", metavar="PROFILE", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    unknown = [name for name in args.profiles if name not in CPU_PROFILES]
+    if unknown:
+        parser.error(f"unknown profile {', '.join(unknown)}, choose from {', '.join(CPU_PROFILES)}")
+
+    if args.child:
+        print(json.dumps(measure(CPU_PROFILES[args.child], args.camera, args.seconds)))
+        return
+
+    print(f"stand in front of the camera, each profile runs for {args.seconds:.0f} s")
+    print(f"{'profile':<10} {'captured':>9} {'inferred':>9} {'gestures':>9} {'CPU':>6} {'CPU/frame':>10}")
+    for name in args.profiles:
+        command = [sys.executable, __file__, "--child", name, "--seconds", str(args.seconds)]
+        if args.camera is not None:
+            command += ["--camera", str(args.camera)]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            error = (completed.stderr.strip().splitlines() or ["no output"])[-1]
+            print(f"{name:<10} failed: {error}")
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(
+            f"{name:<10} {result['captured_fps']:>7.1f}/s {result['inferred_fps']:>7.1f}/s "
+            f"{result['dispatched_fps']:>7.1f}/s {result['cpu_percent']:>5.0f}% {result['cpu_ms_per_frame']:>8.1f}ms"
+        )
+    print("CPU is a percentage of one core, frame rates are per second of wall time")
+
+
+if __name__ == "__main__":
+    main()
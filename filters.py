@@ -0,0 +1,80 @@
+import math
+import numpy as np
+from config import FILTER_MIN_CUTOFF, FILTER_BETA, FILTER_D_CUTOFF
+from movement_utils import NUM_LANDMARKS, LANDMARK_FIELDS, VISIBILITY
+
+MAX_GAP = 0.5  # Seconds without landmarks after which the filter starts over
+
+
+def smoothing_factor(cutoff, dt):
+    """Exponential smoothing factor for a low-pass filter with this cutoff frequency"""
+    return 1.0 / (1.0 + 1.0 / (2 * math.pi * cutoff * dt))
+
+
+class OneEuroFilter:
+    """One Euro filter over x, y and z of every landmark in one vectorized step.
+
+    Slow movements are smoothed hard to remove jitter, fast ones pass through
+    with little lag since the cutoff rises with speed (beta). The filtered
+    velocity can extrapolate the pose `lookahead` seconds ahead, so gestures
+    trigger on predicted threshold crossings instead of one inference late.
+    Visibility passes through unfiltered.
+    """
+
+    def __init__(self, min_cutoff=FILTER_MIN_CUTOFF, beta=FILTER_BETA, d_cutoff=FILTER_D_CUTOFF, lookahead=0.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.lookahead = lookahead
+        self._position = np.zeros((NUM_LANDMARKS, 3))
+        self._velocity = np.zeros((NUM_LANDMARKS, 3))
+        self._scratch = np.zeros((NUM_LANDMARKS, 3))
+        self._alpha = np.zeros((NUM_LANDMARKS, 3))
+        self._last_time = None
+        # Reused every frame, like PoseDetector.landmarks
+        self.output = np.zeros((NUM_LANDMARKS, LANDMARK_FIELDS), dtype=np.float32)
+
+    def reset(self):
+        self._last_time = None
+
+    def __call__(self, landmarks, timestamp):
+        """Filter one frame of landmarks, None resets the filter and is passed through"""
+        if landmarks is None:
+            self.reset()
+            return None
+
+        raw = landmarks[:, :3]
+        dt = timestamp - self._last_time if self._last_time is not None else 0.0
+        if dt <= 0 or dt > MAX_GAP:
+            self._position[:] = raw
+            self._velocity[:] = 0
+        else:
+            # Velocity: low-pass the finite difference with a fixed cutoff
+            velocity = np.subtract(raw, self._position, out=self._scratch)
+            velocity /= dt
+            velocity -= self._velocity
+            velocity *= smoothing_factor(self.d_cutoff, dt)
+            self._velocity += velocity
+
+            # Position: cutoff grows with speed, alpha = 1 / (1 + 1 / (2 pi cutoff dt))
+            alpha = np.abs(self._velocity, out=self._alpha)
+            alpha *= self.beta
+            alpha += self.min_cutoff
+            alpha *= 2 * math.pi * dt
+            np.reciprocal(alpha, out=alpha)
+            alpha += 1.0
+            np.reciprocal(alpha, out=alpha)
+            step = np.subtract(raw, self._position, out=self._scratch)
+            step *= alpha
+            self._position += step
+        self._last_time = timestamp
+
+        output = self.output
+        if self.lookahead:
+            np.multiply(self._velocity, self.lookahead, out=self._scratch)
+            self._scratch += self._position
+            output[:, :3] = self._scratch
+        else:
+            output[:, :3] = self._position
+        output[:, VISIBILITY] = landmarks[:, VISIBILITY]
+        return output
@@ -0,0 +1,128 @@
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+QualityLevel = namedtuple(
+    "QualityLevel",
+    "name model_complexity smooth_landmarks min_detection_confidence min_tracking_confidence frame_skip"
+)
+
+# Best quality first. frame_skip is the number of frames reusing the last
+# landmarks after each inferred one. A lower tracking confidence keeps
+# MediaPipe tracking the player instead of running the detector again.
+QUALITY_LEVELS = (
+    QualityLevel("heavy", 2, True, 0.5, 0.5, 0),
+    QualityLevel("full", 1, True, 0.5, 0.5, 0),
+    QualityLevel("lite", 0, True, 0.5, 0.5, 0),
+    QualityLevel("lite-unsmoothed", 0, False, 0.5, 0.3, 0),
+    QualityLevel("lite-alternate", 0, False, 0.5, 0.3, 1),
+)
+
+
+class FrameRateGovernor:
+    """Steps pose model quality down when the loop misses its budget and back up with headroom.
+
+    observe() is fed the pose detector's time per frame (zero on skipped frames)
+    and the capture-to-gesture latency. Every `window` frames their averages
+    are compared with the frame time allowed by the target FPS and with the
+    latency budget. Headroom for stepping up is judged on the time the level
+    above would take per frame, i.e. per inferred frame when it skips fewer
+    frames, since skipped frames cost nothing and would otherwise look like
+    headroom. Stepping up needs two windows of headroom in a row, twice as many
+    each time a step up had to be undone (up to max_backoff), and the window
+    right after a switch is ignored since it pays for rebuilding the model, so
+    the quality does not oscillate.
+    """
+
+    def __init__(self, pose_detector, target_fps, latency_budget_ms, levels=QUALITY_LEVELS,
+                 start_level="full", window=30, headroom=0.7, max_backoff=32):
+        self.pose_detector = pose_detector
+        self.frame_budget = 1.0 / target_fps
+        self.latency_budget = latency_budget_ms / 1000.0
+        self.levels = levels
+        self.window = window
+        self.headroom = headroom
+        self.max_backoff = max_backoff
+        self.level = next(i for i, level in enumerate(levels) if level.name == start_level)
+        self.switches = 0
+        self._reset_window()
+        self._headroom_windows = 0
+        self._required_windows = 2  # Headroom windows needed to step up, grows after a step up is undone
+        self._last_step = 0
+        self._settling = True
+        if self.current.name != pose_detector.model:
+            self._apply()  # Otherwise the warmed-up model already matches, no need to rebuild it
+
+    @property
+    def current(self):
+        return self.levels[self.level]
+
+    def _reset_window(self):
+        self._frames = 0
+        self._inferred = 0
+        self._processing_total = 0.0
+        self._latency_total = 0.0
+
+    def _apply(self):
+        level = self.current
+        self.pose_detector.configure(
+            model_complexity=level.model_complexity,
+            smooth_landmarks=level.smooth_landmarks,
+            min_detection_confidence=level.min_detection_confidence,
+            min_tracking_confidence=level.min_tracking_confidence,
+            frame_skip=level.frame_skip
+        )
+
+    def _switch(self, step, processing_time, latency, reason):
+        old = self.current
+        self.level += step
+        self.switches += 1
+        logger.info(
+            "pose quality %s -> %s: %s (pose %.1f ms vs %.1f ms budget, latency %.1f ms vs %.1f ms budget)",
+            old.name, self.current.name, reason,
+            processing_time * 1000, self.frame_budget * 1000, latency * 1000, self.latency_budget * 1000
+        )
+        if step > 0 and self._last_step < 0:
+            # The step up did not hold, wait longer before trying it again
+            self._required_windows = min(self._required_windows * 2, self.max_backoff)
+        self._last_step = step
+        self._settling = True
+        self._apply()
+
+    def observe(self, processing_time, latency):
+        """Account one frame, possibly switching quality level once the window is full"""
+        self._frames += 1
+        self._inferred += processing_time > 0
+        self._processing_total += processing_time
+        self._latency_total += latency
+        if self._frames < self.window:
+            return
+
+        processing_time = self._processing_total / self._frames
+        latency = self._latency_total / self._frames
+        # What a frame would cost one level up, where fewer frames are skipped
+        stepped_up_time = processing_time
+        if self.level > 0:
+            per_inference = self._processing_total / max(1, self._inferred)
+            stepped_up_time = per_inference / (1 + self.levels[self.level - 1].frame_skip)
+        self._reset_window()
+        if self._settling:
+            self._settling = False
+            return
+
+        over_budget = processing_time > self.frame_budget or latency > self.latency_budget
+        has_headroom = (max(processing_time, stepped_up_time) < self.frame_budget * self.headroom and
+                        latency < self.latency_budget * self.headroom)
+
+        if over_budget:
+            self._headroom_windows = 0
+            if self.level < len(self.levels) - 1:
+                self._switch(1, processing_time, latency, "over budget")
+        elif has_headroom:
+            self._headroom_windows += 1
+            if self._headroom_windows >= self._required_windows and self.level > 0:
+                self._headroom_windows = 0
+                self._switch(-1, stepped_up_time, latency, "headroom")
+        else:
+            self._headroom_windows = 0
@@ -1,3 +1,9 @@
+import csv
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+import numpy as np
 from pynput.keyboard import Controller as KeyboardController, Key
 from pynput.mouse import Controller as MouseController, Button
 
@@ -5,54 +11,284 @@ from pynput.mouse import Controller as MouseController, Button
 keyboard = KeyboardController()
 mouse = MouseController()
 
+MOUSE_STEP = 10  # Pixels moved per mouse_* action
+CURSOR_RESYNC_INTERVAL = 0.25  # Seconds a locally tracked cursor position is trusted before reading it again
+
+# Unit (dx, dy) for each mouse_* direction
+MOUSE_DIRECTIONS = {
+    "left": (-1, 0),
+    "right": (1, 0),
+    "up": (0, -1),
+    "down": (0, 1)
+}
+
+SPECIAL_KEYS = {
+    "left": Key.left,
+    "right": Key.right,
+    "down": Key.down,
+    "space": Key.space,
+    "shift": Key.shift,
+    "up": Key.up
+}
+
+MOUSE_BUTTONS = {
+    "left_click": Button.left,
+    "right_click": Button.right,
+    "middle_click": Button.middle
+}
+
+# Binding name -> (press, release) callables, filled in by resolve_action
+_actions = {}
+
+# capture_time is when the camera frame that caused the action was read,
+# dispatch_time when the action reached the OS, both time.perf_counter()
+InputEvent = namedtuple("InputEvent", "action_key action_type capture_time dispatch_time")
+
 def get_key(key_name):
     """Convert key name to actual key command"""
-    special_keys = {
-        "left": Key.left,
-        "right": Key.right,
-        "down": Key.down,
-        "space": Key.space,
-        "shift": Key.shift,
-        "up": Key.up
-    }
-
-    mouse_buttons = {
-        "left_click": Button.left,
-        "right_click": Button.right,
-        "middle_click": Button.middle
-    }
-
-    if key_name in mouse_buttons:
-        return mouse_buttons[key_name]
-    return special_keys.get(key_name.lower(), key_name)
-
-def move_mouse(direction, amount=10):
-    """Move the mouse cursor in the specified direction"""
-    current_pos = mouse.position
-    x, y = current_pos
-
-    if direction == "left":
-        mouse.position = (x - amount, y)
-    elif direction == "right":
-        mouse.position = (x + amount, y)
-    elif direction == "up":
-        mouse.position = (x, y - amount)
-    elif direction == "down":
-        mouse.position = (x, y + amount)
-
-def handle_input_action(action_key, action_type):
-    """Handle keyboard and mouse input actions"""
+    if key_name in MOUSE_BUTTONS:
+        return MOUSE_BUTTONS[key_name]
+    return SPECIAL_KEYS.get(key_name.lower(), key_name)
+
+class _Cursor:
+    """Where the cursor is, tracked locally so moves do not each ask the OS first.
+
+    pynput's Controller.move reads the position before setting it, so moves
+    set absolute positions from the tracked one instead. The position is read
+    again after CURSOR_RESYNC_INTERVAL, which picks up the physical mouse and
+    the screen edges.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()  # The dispatcher and the analog mouse thread both move it
+        self._position = None
+        self._synced_at = 0.0
+
+    def move_by(self, dx, dy):
+        with self._lock:
+            now = time.perf_counter()
+            if self._position is None or now - self._synced_at > CURSOR_RESYNC_INTERVAL:
+                self._position = mouse.position
+                self._synced_at = now
+            x, y = self._position
+            self._position = (x + dx, y + dy)
+            mouse.position = self._position
+
+
+_cursor = _Cursor()
+
+def move_mouse_by(dx, dy):
+    """Move the mouse cursor relative to where it is, from the locally tracked position"""
+    if dx or dy:
+        _cursor.move_by(dx, dy)
+
+def _nothing(capture_time=None):
+    pass
+
+def resolve_action(action_key):
+    """Turn a binding name into ready-to-call (press, release) functions, parsed once per name.
+
+    Both take an optional capture_time so they can stand in for an emit function.
+    """
+    actions = _actions.get(action_key)
+    if actions is not None:
+        return actions
+
     if action_key.endswith("_click"):
-        if action_type == "press":
-            mouse.press(get_key(action_key))
-        else:
-            mouse.release(get_key(action_key))
+        button = get_key(action_key)
+
+        def press(capture_time=None):
+            mouse.press(button)
+
+        def release(capture_time=None):
+            mouse.release(button)
+
+        actions = (press, release)
     elif action_key.startswith("mouse_"):
-        direction = action_key.split("_")[1]
-        move_mouse(direction)
+        dx, dy = MOUSE_DIRECTIONS.get(action_key.split("_")[1], (0, 0))
+
+        def move(capture_time=None):
+            move_mouse_by(dx * MOUSE_STEP, dy * MOUSE_STEP)
+
+        actions = (move, move)  # The cursor moves on press and on release
     else:
         key = get_key(action_key)
-        if action_type == "press":
+
+        def tap(capture_time=None):
             keyboard.press(key)
-            if action_type != "hold":  # For non-hold actions, release immediately
-                keyboard.release(key)
\ No newline at end of file
+            keyboard.release(key)
+
+        actions = (tap, _nothing)  # Keys are tapped on press, so release does nothing
+
+    _actions[action_key] = actions
+    return actions
+
+def handle_input_action(action_key, action_type, capture_time=None):
+    """Handle keyboard and mouse input actions"""
+    press, release = _actions.get(action_key) or resolve_action(action_key)
+    if action_type == "press":
+        press()
+    else:
+        release()
+
+
+class EventLog:
+    """Keeps the most recent input events to measure motion-to-input latency"""
+
+    def __init__(self, maxlen=100000):
+        self.events = deque(maxlen=maxlen)
+
+    def record(self, action_key, action_type, capture_time, dispatch_time):
+        self.events.append(InputEvent(action_key, action_type, capture_time, dispatch_time))
+
+    def latency_percentiles(self):
+        """(p50, p95, p99) capture-to-dispatch latency in milliseconds, None without timed events"""
+        latencies = [e.dispatch_time - e.capture_time for e in self.events if e.capture_time is not None]
+        if not latencies:
+            return None
+        p50, p95, p99 = np.percentile(latencies, (50, 95, 99)) * 1000
+        return p50, p95, p99
+
+    def export(self, path):
+        """Write every event with its capture and dispatch time as CSV"""
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(("action_key", "action_type", "capture_time", "dispatch_time", "latency_ms"))
+            for e in self.events:
+                latency = "" if e.capture_time is None else f"{(e.dispatch_time - e.capture_time) * 1000:.3f}"
+                writer.writerow((e.action_key, e.action_type, e.capture_time, e.dispatch_time, latency))
+
+
+class LoggedInput:
+    """Sends input actions right away, like handle_input_action, and logs each one"""
+
+    def __init__(self, event_log):
+        self.event_log = event_log
+
+    def __call__(self, action_key, action_type, capture_time=None):
+        handle_input_action(action_key, action_type)
+        self.event_log.record(action_key, action_type, capture_time, time.perf_counter())
+
+
+_STOP = object()
+
+
+class InputDispatcher:
+    """Sends input actions from a worker thread so slow OS input never stalls the frame loop.
+
+    Instances are called like handle_input_action and log every dispatched
+    action to event_log if one is given. Everything queued since the
+    worker last ran is merged before dispatch: back-to-back mouse moves become
+    one relative move, and presses of held buttons, releases of buttons that
+    are up and key releases (keys are tapped on press) are dropped. Every tap
+    is kept. Once max_queue actions are waiting, new moves and presses are
+    dropped, but releases are always queued so no button is left held.
+    """
+
+    def __init__(self, max_queue=64, event_log=None):
+        self.queue = queue.Queue()  # Unbounded so releases always fit, __call__ enforces max_queue
+        self.max_queue = max_queue
+        self.event_log = event_log
+        self.dispatched = 0  # OS input calls made
+        self.coalesced = 0  # Actions merged away
+        self.dropped = 0  # Moves and presses lost because the queue was full
+        self.max_depth = 0
+        self.last_latency = 0.0  # Seconds from queueing to dispatch
+        self.max_latency = 0.0
+        self._latency_total = 0.0
+        self._held_buttons = set()
+        self._thread = threading.Thread(target=self._run, name="input", daemon=True)
+        self._thread.start()
+
+    def __call__(self, action_key, action_type, capture_time=None):
+        if action_type != "release" and self.queue.qsize() >= self.max_queue:
+            self.dropped += 1
+            return
+        self.queue.put_nowait((time.perf_counter(), action_key, action_type, capture_time))
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    def close(self, timeout=1.0):
+        """Dispatch whatever is still queued, then stop the worker"""
+        self.queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth(),
+            "max_depth": self.max_depth,
+            "dispatched": self.dispatched,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "mean_latency_ms": self._latency_total / self.dispatched * 1000 if self.dispatched else 0.0,
+            "max_latency_ms": self.max_latency * 1000,
+        }
+
+    def _run(self):
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if _STOP in batch:
+                running = False
+                batch = [item for item in batch if item is not _STOP]
+
+            for queued_at, action_key, action_type, capture_time in self._coalesce(batch):
+                if action_key is None:
+                    move_mouse_by(*action_type)
+                else:
+                    handle_input_action(action_key, action_type)
+                dispatch_time = time.perf_counter()
+                if self.event_log is not None:
+                    if action_key is None:
+                        self.event_log.record("mouse_move", "move", capture_time, dispatch_time)
+                    else:
+                        self.event_log.record(action_key, action_type, capture_time, dispatch_time)
+                latency = dispatch_time - queued_at
+                self.dispatched += 1
+                self.last_latency = latency
+                self._latency_total += latency
+                if latency > self.max_latency:
+                    self.max_latency = latency
+
+    def _coalesce(self, batch):
+        """Merge a batch of queued actions into the smallest equivalent list"""
+        actions = []
+
+        for queued_at, action_key, action_type, capture_time in batch:
+            if action_key.endswith("_click"):
+                is_held = action_key in self._held_buttons
+                if (action_type == "press") == is_held:
+                    self.coalesced += 1
+                    continue
+                if is_held:
+                    self._held_buttons.discard(action_key)
+                else:
+                    self._held_buttons.add(action_key)
+                actions.append((queued_at, action_key, action_type, capture_time))
+            elif action_key.startswith("mouse_"):
+                step_x, step_y = MOUSE_DIRECTIONS.get(action_key.split("_")[1], (0, 0))
+                dx, dy = step_x * MOUSE_STEP, step_y * MOUSE_STEP
+                if actions and actions[-1][1] is None:
+                    # Only merged with a move right before it, so clicks stay where they were in between moves
+                    move_queued_at, _, (move_x, move_y), move_capture_time = actions[-1]
+                    actions[-1] = (move_queued_at, None, (move_x + dx, move_y + dy), move_capture_time)
+                    self.coalesced += 1
+                else:
+                    actions.append((queued_at, None, (dx, dy), capture_time))
+            else:
+                if action_type != "press":
+                    self.coalesced += 1
+                    continue
+                # Every press is a whole tap, two of them are two inputs
+                actions.append((queued_at, action_key, action_type, capture_time))
+        return actions
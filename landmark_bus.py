@@ -0,0 +1,244 @@
+import argparse
+import time
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from movement_utils import NUM_LANDMARKS, LANDMARK_FIELDS
+from recording import LandmarkRecorder
+
+# Shared memory layout: a header followed by a ring of fixed-size slots.
+# head counts the frames published so far; frame n lives in slot n % capacity.
+# Each slot is guarded by a seqlock: the writer makes seq odd, writes the slot,
+# then sets seq to 2 * (n + 1). A reader that sees an odd seq, or a different
+# seq after copying, raced the writer and just tries again, so the producer
+# never waits for anyone.
+MAGIC = b"KKLB"
+VERSION = 1
+BUS_SLOTS = 64  # Frames kept in the ring, about two seconds at 30 fps
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("num_landmarks", "<u2"),
+    ("fields", "<u2"),
+    ("capacity", "<u2"),
+    ("head", "<u8"),
+], align=True)
+
+SLOT_DTYPE = np.dtype([
+    ("seq", "<u8"),
+    ("time", "<f8"),  # Capture timestamp from time.perf_counter(), comparable across processes
+    ("valid", "u1"),  # 0 when no pose was found in the frame
+    ("landmarks", "<f4", (NUM_LANDMARKS, LANDMARK_FIELDS)),
+], align=True)
+
+
+def _segment_size(capacity):
+    return HEADER_DTYPE.itemsize + capacity * SLOT_DTYPE.itemsize
+
+
+def _views(shm, capacity):
+    header = np.ndarray((), dtype=HEADER_DTYPE, buffer=shm.buf)
+    slots = np.ndarray((capacity,), dtype=SLOT_DTYPE, buffer=shm.buf, offset=HEADER_DTYPE.itemsize)
+    return header, slots
+
+
+class LandmarkBus:
+    """Publishes every frame's landmarks into a named shared memory ring for other processes.
+
+    A segment called name that already exists belongs to another producer,
+    or one that crashed; only replace=True takes it over.
+    """
+
+    def __init__(self, name, capacity=BUS_SLOTS, replace=False):
+        size = _segment_size(capacity)
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            if not replace:
+                raise FileExistsError(
+                    f"landmark bus {name} already exists, another producer may be publishing to it"
+                ) from None
+            # The caller says its producer is gone, readers still attached stay on the old segment
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        self.name = name
+        self.capacity = capacity
+        self._header, self._slots = _views(self._shm, capacity)
+        self._header["magic"] = MAGIC
+        self._header["version"] = VERSION
+        self._header["num_landmarks"] = NUM_LANDMARKS
+        self._header["fields"] = LANDMARK_FIELDS
+        self._header["capacity"] = capacity
+        self._header["head"] = 0
+        self.published = 0
+
+    def publish(self, landmarks, capture_time):
+        """Write one frame into the ring, landmarks may be None when no pose was detected"""
+        n = self.published
+        slot = self._slots[n % self.capacity]
+        slot["seq"] = 2 * n + 1  # Odd while the slot is being written
+        slot["time"] = capture_time
+        if landmarks is None:
+            slot["valid"] = 0
+        else:
+            slot["valid"] = 1
+            slot["landmarks"] = landmarks
+        slot["seq"] = 2 * n + 2
+        self.published = n + 1
+        self._header["head"] = n + 1
+
+    def close(self):
+        """Remove the segment, readers still attached keep their mapping until they close"""
+        self._header = self._slots = None  # The views must go before the mapping can be closed
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass  # Another producer replaced it and has removed it since
+
+
+class LandmarkBusReader:
+    """Attaches to a LandmarkBus by name and reads frames without ever blocking the producer"""
+
+    def __init__(self, name):
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching also registers the segment with the
+            # resource tracker, which would unlink it when this reader exits
+            self._shm = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self._shm.buf)
+        if header["magic"] != MAGIC or header["version"] != VERSION:
+            del header
+            self._shm.close()
+            raise ValueError(f"{name} is not a landmark bus")
+        if (header["num_landmarks"], header["fields"]) != (NUM_LANDMARKS, LANDMARK_FIELDS):
+            del header
+            self._shm.close()
+            raise ValueError(f"{name} uses an unsupported landmark layout")
+
+        self.name = name
+        self.capacity = int(header["capacity"])
+        del header
+        self._header, self._slots = _views(self._shm, self.capacity)
+        self.landmarks = np.zeros((NUM_LANDMARKS, LANDMARK_FIELDS), dtype=np.float32)
+        self.next_seq = 0  # Sequence number of the next frame this reader has not seen
+        self.missed = 0  # Frames overwritten before this reader got to them
+        self.retries = 0  # Reads that raced the producer and were repeated
+
+    def _read(self, n, out):
+        """Copy frame n into out, returns (time, valid), or None once it has been overwritten"""
+        slot = self._slots[n % self.capacity]
+        expected = 2 * n + 2
+        while True:
+            seq = int(slot["seq"])
+            if seq > expected:
+                return None
+            if seq == expected:
+                capture_time = float(slot["time"])
+                valid = bool(slot["valid"])
+                out[...] = slot["landmarks"]
+                if int(slot["seq"]) == seq:
+                    return capture_time, valid
+            # Mid-write, only ever for the few microseconds it takes to fill one slot
+            self.retries += 1
+
+    def head(self):
+        """Number of frames published so far"""
+        return int(self._header["head"])
+
+    def latest(self, out=None):
+        """Newest frame as (seq, capture_time, landmarks or None), or None if nothing new.
+
+        landmarks is copied into out, or into this reader's own array which
+        the next call overwrites. Frames in between are skipped and counted
+        in missed.
+        """
+        head = self.head()
+        if head <= self.next_seq:
+            return None
+        out = self.landmarks if out is None else out
+        n = head - 1
+        result = self._read(n, out)
+        while result is None:
+            # Lapped while copying, take whatever is newest now
+            n = self.head() - 1
+            result = self._read(n, out)
+
+        self.missed += n - self.next_seq
+        self.next_seq = n + 1
+        capture_time, valid = result
+        return n, capture_time, out if valid else None
+
+    def frames(self, out=None):
+        """Yield every frame published since the last call, oldest first, as latest() does.
+
+        Frames already overwritten in the ring are skipped and counted in missed.
+        """
+        out = self.landmarks if out is None else out
+        head = self.head()
+        n = max(self.next_seq, head - self.capacity)
+        self.missed += n - self.next_seq
+        while n < head:
+            result = self._read(n, out)
+            if result is None:
+                self.missed += 1
+            else:
+                capture_time, valid = result
+                self.next_seq = n + 1
+                yield n, capture_time, out if valid else None
+            n += 1
+        self.next_seq = max(self.next_seq, head)
+
+    def close(self):
+        self._header = self._slots = None
+        self._shm.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch or record the landmarks published by main.py --bus")
+    parser.add_argument("name", help="bus name given to main.py --bus")
+    parser.add_argument("--record", metavar="PATH", help="also write every frame to a landmark recording")
+    parser.add_argument("--interval", type=float, default=1.0, metavar="SECONDS", help="time between reports")
+    args = parser.parse_args()
+
+    reader = LandmarkBusReader(args.name)
+    recorder = LandmarkRecorder(args.record) if args.record else None
+    print(f"attached to {args.name} ({reader.capacity} slots), press Ctrl+C to stop")
+
+    frames, poses, age = 0, 0, 0.0
+    report_at = time.perf_counter() + args.interval
+    try:
+        while True:
+            for _, capture_time, landmarks in reader.frames():
+                frames += 1
+                poses += landmarks is not None
+                age += time.perf_counter() - capture_time
+                if recorder:
+                    recorder.write(landmarks, capture_time)
+
+            now = time.perf_counter()
+            if now >= report_at:
+                mean_age = age / frames * 1000 if frames else 0.0
+                print(
+                    f"{frames / args.interval:5.1f} frames/s, {poses} with a pose, "
+                    f"capture-to-read {mean_age:5.1f} ms, {reader.missed} missed in total"
+                )
+                frames, poses, age = 0, 0, 0.0
+                report_at = now + args.interval
+            time.sleep(0.005)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if recorder:
+            recorder.close()
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,76 +1,484 @@
-import cv2
+import argparse
+import logging
+import signal
 import time
-from config import load_keybindings, load_toggles, CAMERA_INDEX
-from pose_detection import PoseDetector
-from movement_handlers import (
-    handle_arm_movement,
-    handle_head_tilt,
-    handle_vertical_movements,
-    handle_jump,
-    handle_knee_clap,
-    handle_left_knee_raise
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    load_keybindings,
+    load_toggles,
+    ConfigWatcher,
+    CAMERA_INDEX,
+    INFERENCE_SIZE,
+    POSE_BACKEND,
+    POSE_MODEL,
+    ROI_PADDING,
+    MOTION_THRESHOLD,
+    TARGET_FPS,
+    CPU_PROFILE,
+    LATENCY_BUDGET_MS
 )
+from pipeline import PosePipeline
+from movement_handlers import GestureEngine
+from profiler import StageProfiler
+from governor import FrameRateGovernor
+from filters import OneEuroFilter
+from analog_mouse import STEERING_GESTURES, AnalogMouse
+from recording import LandmarkRecorder
+from landmark_bus import LandmarkBus
+from startup import StartupProfiler, load_camera_cache, open_camera
+from cpu_budget import CPU_PROFILES, apply_opencv_threads, pin_thread
 
+# OpenCV, MediaPipe and pynput are imported inside main() so they can load
+# while the camera is being opened
 
-def main():
-    # Load configuration
-    keybindings = load_keybindings()
-    toggles = load_toggles()
 
-    # Initialize camera and pose detection
-    cap = cv2.VideoCapture(CAMERA_INDEX)
-    pose_detector = PoseDetector()
+def parse_args():
+    parser = argparse.ArgumentParser(description="Control games with body movements")
+    parser.add_argument(
+        "--camera",
+        type=int,
+        default=CAMERA_INDEX,
+        metavar="INDEX",
+        help="camera to use (default: the one that worked last time, else the first that works)"
+    )
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="print how long each startup step took"
+    )
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="run capture and pose inference on their own threads, always working on the newest frame"
+    )
+    parser.add_argument(
+        "--record",
+        metavar="PATH",
+        help="write every frame's landmarks to PATH for offline replay with replay.py"
+    )
+    parser.add_argument(
+        "--bus",
+        metavar="NAME",
+        help="publish every frame's landmarks to shared memory NAME for other processes, see landmark_bus.py"
+    )
+    parser.add_argument(
+        "--bus-replace",
+        action="store_true",
+        help="take over an existing --bus NAME, e.g. one left behind by a crash, instead of refusing to start"
+    )
+    parser.add_argument(
+        "--async-input",
+        action="store_true",
+        help="send key presses and mouse moves from a worker thread, merging bursts of input"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("solutions", "tasks"),
+        default=POSE_BACKEND,
+        help="pose API: the legacy solutions Pose, or the Tasks PoseLandmarker running asynchronously "
+             f"(default: {POSE_BACKEND})"
+    )
+    parser.add_argument(
+        "--model",
+        choices=("lite", "full", "heavy"),
+        default=None,
+        help="pose model, the tasks backend loads it from POSE_MODEL_FILES in config.py "
+             f"(default: the --cpu-profile's model, else {POSE_MODEL})"
+    )
+    parser.add_argument(
+        "--no-roi",
+        action="store_true",
+        help="always run pose detection on the whole frame instead of a box around the player"
+    )
+    parser.add_argument(
+        "--inference-size",
+        type=int,
+        default=INFERENCE_SIZE,
+        metavar="PIXELS",
+        help=f"downscale the image given to the pose model to this longest side, 0 to disable "
+             f"(default: {INFERENCE_SIZE})"
+    )
+    parser.add_argument(
+        "--motion-gate",
+        action="store_true",
+        default=None,
+        help="skip pose inference on frames where nothing moved, keeping the last landmarks"
+    )
+    parser.add_argument(
+        "--no-motion-gate",
+        dest="motion_gate",
+        action="store_false",
+        help="infer every frame even when the --cpu-profile turns the motion gate on"
+    )
+    parser.add_argument(
+        "--motion-threshold",
+        type=float,
+        default=MOTION_THRESHOLD,
+        metavar="LEVELS",
+        help=f"gray levels of change that count as movement for --motion-gate (default: {MOTION_THRESHOLD})"
+    )
+    parser.add_argument(
+        "--adaptive-quality",
+        action="store_true",
+        help="switch the pose model between heavy/full/lite and skip frames to hold the target FPS"
+    )
+    parser.add_argument(
+        "--target-fps",
+        type=float,
+        default=TARGET_FPS,
+        metavar="FPS",
+        help=f"frame rate --adaptive-quality aims for (default: {TARGET_FPS})"
+    )
+    parser.add_argument(
+        "--latency-budget",
+        type=float,
+        default=LATENCY_BUDGET_MS,
+        metavar="MS",
+        help=f"capture-to-gesture latency --adaptive-quality aims to stay under (default: {LATENCY_BUDGET_MS})"
+    )
+    parser.add_argument(
+        "--cpu-profile",
+        choices=tuple(CPU_PROFILES),
+        default=CPU_PROFILE,
+        help="thread caps, CPU pinning and capture rate; low-power also uses the lite model and --motion-gate. "
+             f"Compare them with cpu_budget.py (default: {CPU_PROFILE})"
+    )
+    parser.add_argument(
+        "--filter",
+        action="store_true",
+        help="smooth landmarks with a One Euro filter before evaluating gestures"
+    )
+    parser.add_argument(
+        "--lookahead-ms",
+        type=float,
+        default=0,
+        metavar="MS",
+        help="with --filter, evaluate gestures on the pose predicted this far ahead, e.g. 30"
+    )
+    parser.add_argument(
+        "--analog-mouse",
+        action="store_true",
+        help="steer the cursor smoothly with head tilt and right wrist height instead of mouse_* bindings, "
+             "tilt_left and tilt_right are turned off meanwhile"
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="no preview window and no drawing, quit with Ctrl+C"
+    )
+    parser.add_argument(
+        "--preview-fps",
+        type=float,
+        default=0,
+        metavar="FPS",
+        help="cap how often the preview window is redrawn, e.g. 10 (default: every frame)"
+    )
+    parser.add_argument(
+        "--preview-scale",
+        type=float,
+        default=1.0,
+        metavar="SCALE",
+        help="draw the preview on a copy resized by SCALE, e.g. 0.5"
+    )
+    parser.add_argument(
+        "--profile-overlay",
+        action="store_true",
+        help="draw rolling per-stage p50/p95/p99 timings on the preview window"
+    )
+    parser.add_argument(
+        "--profile-out",
+        metavar="PATH",
+        help="write per-frame stage timings to PATH on exit (.json for JSON, otherwise CSV)"
+    )
+    parser.add_argument(
+        "--events-out",
+        metavar="PATH",
+        help="write every input event with its capture and dispatch time to PATH as CSV on exit"
+    )
+    return parser.parse_args()
+
+
+def tilt_status(engine):
+    """Head tilt status text for the preview window"""
+    if engine.is_active("tilt_left"):
+        return "tiltLeft"
+    if engine.is_active("tilt_right"):
+        return "tiltRight"
+    return "tiltCenter"
+
+
+class Session:
+    """Everything that happens to a frame once its landmarks are known"""
+
+    def __init__(self, pose_detector, engine, profiler, recorder=None, preview=None, overlay=False,
+                 governor=None, landmark_filter=None, engine_factory=None, analog_mouse=None, bus=None):
+        self.pose_detector = pose_detector
+        self.engine = engine
+        self.profiler = profiler
+        self.recorder = recorder
+        self.preview = preview  # None when running headless
+        self.overlay = overlay
+        self.governor = governor
+        self.landmark_filter = landmark_filter
+        # Rebuilds the engine from the JSON files whenever config_gui.py saves them
+        self.engine_factory = engine_factory
+        self.config_watcher = ConfigWatcher() if engine_factory else None
+        self.analog_mouse = analog_mouse
+        self.bus = bus  # LandmarkBus other processes read the raw landmarks from
+        self.stop_requested = False
+        self._frame_end = profiler.start()
+
+    def request_stop(self, *_):
+        """Signal handler used to quit when there is no preview window"""
+        self.stop_requested = True
+
+    def reload_bindings(self):
+        """Swap in a gesture engine built from the current keybindings and toggles files"""
+        try:
+            engine = self.engine_factory()
+        except (ValueError, OSError) as e:
+            # Most likely caught the file halfway through being saved, try again later
+            logging.warning("could not reload bindings: %s", e)
+            self.config_watcher.retry()
+            return
+        self.engine.release_all()
+        self.engine = engine
+        logging.info("reloaded keybindings and toggles")
+
+    def handle_frame(self, frame, landmarks, capture_time):
+        """Evaluate gestures and update the preview, returns False once the user asked to quit"""
+        profiler = self.profiler
+        start = profiler.start()
 
-    # Initialize state variables
-    neutral_angle = 0
+        if self.config_watcher and self.config_watcher.changed():
+            self.reload_bindings()
+        if self.recorder:
+            self.recorder.write(landmarks, capture_time)
+        if self.bus:
+            self.bus.publish(landmarks, capture_time)
 
+        if self.landmark_filter:
+            landmarks = self.landmark_filter(landmarks, capture_time)
+
+        if landmarks is not None:
+            # Cooldowns run on the capture timestamp, not on when inference happened to finish
+            self.engine.update(landmarks, capture_time)
+        if self.analog_mouse:
+            self.analog_mouse.update(landmarks)
+        profiler.record("gestures", start)
+
+        if self.governor:
+            self.governor.observe(self.pose_detector.last_inference_time, time.perf_counter() - capture_time)
+
+        keep_running = not self.stop_requested
+        if self.preview and self.preview.due():
+            status_lines = []
+            if self.engine.is_enabled("tilt_left") or self.engine.is_enabled("tilt_right"):
+                status_lines.append(tilt_status(self.engine))
+            overlay_lines = ["stage       p50    p95    p99"] + profiler.summary_lines() if self.overlay else ()
+            keep_running = self.preview.render(frame, landmarks, status_lines, overlay_lines) and keep_running
+
+        # Time since the previous frame finished, the effective frame period
+        self._frame_end = profiler.record("frame", self._frame_end)
+        profiler.end_frame()
+        return keep_running
+
+
+def run_serial(cap, session, cpu_profile):
+    """Capture, infer and dispatch one frame at a time"""
+    # One thread does both stages, so it may use the CPUs of either
+    pin_thread((cpu_profile.capture_cores or ()) + (cpu_profile.inference_cores or ()))
+    profiler = session.profiler
     while cap.isOpened():
+        start = profiler.start()
         ret, frame = cap.read()
         if not ret:
             break
+        capture_time = time.perf_counter()
+        profiler.record("read", start)
 
         # Process frame
-        results = pose_detector.process_frame(frame)
-        current_time = time.time()
-
-        if results.pose_landmarks:
-            landmarks = results.pose_landmarks.landmark
-
-            # Handle arm movements
-            handle_arm_movement(landmarks, "left", keybindings, toggles)
-            handle_arm_movement(landmarks, "right", keybindings, toggles)
-
-            # Handle head tilt
-            if toggles.get("tilt_left", False) or toggles.get("tilt_right", False):
-                neutral_angle, tilt_status = handle_head_tilt(
-                    landmarks,
-                    keybindings,
-                    toggles,
-                    neutral_angle,
-                    current_time
-                )
-                pose_detector.draw_status(frame, tilt_status)
-
-            # Handle vertical arm positions
-            handle_vertical_movements(
-                landmarks,
-                keybindings,
-                toggles,
-                current_time
+        landmarks = session.pose_detector.process_frame(frame)
+
+        if not session.handle_frame(frame, landmarks, capture_time):
+            break
+
+
+def run_pipelined(cap, session, cpu_profile):
+    """Dispatch gestures from the capture/inference pipeline, skipping stale frames"""
+    pipeline = PosePipeline(
+        cap, session.pose_detector, session.profiler,
+        capture_cores=cpu_profile.capture_cores,
+        inference_cores=cpu_profile.inference_cores
+    )
+    pipeline.start()
+
+    try:
+        for packet in pipeline.packets():
+            if not session.handle_frame(packet.frame, packet.landmarks, packet.capture_time):
+                break
+    finally:
+        pipeline.stop()
+
+    for stage, stats in pipeline.stats().items():
+        print(f"{stage}: {stats['frames']} frames, {stats['dropped']} dropped")
+    print(f"frame buffers allocated: {pipeline.pool.allocated}")
+
+
+def main():
+    startup = StartupProfiler()
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    # Flags given on the command line win over the profile
+    cpu_profile = CPU_PROFILES[args.cpu_profile]
+    if args.model is None:
+        args.model = cpu_profile.model or POSE_MODEL
+        if cpu_profile.model:
+            logging.info("cpu profile %s: using the %s model", cpu_profile.name, args.model)
+    elif cpu_profile.model and args.model != cpu_profile.model:
+        logging.info("cpu profile %s: keeping --model %s instead of %s", cpu_profile.name, args.model, cpu_profile.model)
+    if args.motion_gate is None:
+        args.motion_gate = cpu_profile.motion_gate
+        if cpu_profile.motion_gate:
+            logging.info("cpu profile %s: motion gate on, --no-motion-gate turns it off", cpu_profile.name)
+
+    # Before opening anything, so a bus in use stops the start right away
+    bus = None
+    if args.bus:
+        try:
+            bus = LandmarkBus(args.bus, replace=args.bus_replace)
+        except FileExistsError as e:
+            raise SystemExit(f"{e}, pass --bus-replace if it was left behind by a crash")
+
+    # Per-frame rows are only kept when they are going to be exported, the last hour or so at 30 fps
+    profiler = StageProfiler(history=108000 if args.profile_out else 0)
+
+    def build_detector():
+        # MediaPipe's worker threads inherit this thread's CPU mask
+        pin_thread(cpu_profile.inference_cores)
+        with startup.phase("import mediapipe"):
+            from pose_detection import MotionGate, PoseDetector
+        with startup.phase("build pose model"):
+            detector = PoseDetector(
+                profiler,
+                roi_padding=None if args.no_roi else ROI_PADDING,
+                target_size=args.inference_size,
+                backend=args.backend,
+                model=args.model,
+                motion_gate=MotionGate(args.motion_threshold) if args.motion_gate else None
             )
+        with startup.phase("warm-up inference"):
+            camera_format = load_camera_cache() or {}
+            detector.warm_up(camera_format.get("width", 640), camera_format.get("height", 480))
+        return detector
 
-            # Handle jump, squat, and knee clap
-            handle_jump(landmarks, keybindings, toggles, current_time)
-            handle_left_knee_raise(landmarks, keybindings, toggles, current_time)
-            handle_knee_clap(landmarks, keybindings, toggles, current_time)
+    # Build and warm up the model in the background while the camera opens
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="model") as executor:
+        detector_future = executor.submit(build_detector)
+        with startup.phase("import pynput"):
+            from input_controller import EventLog, InputDispatcher, LoggedInput
+        with startup.phase("open camera"):
+            apply_opencv_threads(cpu_profile)
+            cap, camera_info = open_camera(args.camera)
+            if cpu_profile.capture_fps:
+                cap.configure(width=None, height=None, fourcc=None, fps=cpu_profile.capture_fps, buffer_size=None)
+                cap.limit_fps(cpu_profile.capture_fps)
+        with startup.phase("wait for model"):
+            pose_detector = detector_future.result()
 
-        cv2.imshow("MediaPipe Pose", frame)
+    event_log = EventLog()
+    if args.async_input:
+        dispatcher = InputDispatcher(event_log=event_log)
+        emit = dispatcher
+    else:
+        dispatcher = None
+        emit = LoggedInput(event_log)
+    emit = profiler.timed("input", emit)
 
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+    def make_engine():
+        keybindings = load_keybindings()
+        if args.analog_mouse:
+            # The analog mouse owns the cursor and the head tilt, drop the stepwise
+            # mouse_* moves and the tilt gestures
+            keybindings = {
+                name: binding for name, binding in keybindings.items()
+                if not binding.startswith("mouse_") and name not in STEERING_GESTURES
+            }
+        return GestureEngine(keybindings, load_toggles(), emit=emit)
+
+    recorder = LandmarkRecorder(args.record) if args.record else None
+    preview = None
+    if not args.headless:
+        from preview import PreviewRenderer
+        preview = PreviewRenderer(pose_detector, args.preview_fps, args.preview_scale, profiler=profiler)
+    governor = None
+    if args.adaptive_quality:
+        governor = FrameRateGovernor(pose_detector, args.target_fps, args.latency_budget, start_level=args.model)
+    session = Session(
+        pose_detector, make_engine(), profiler, recorder, preview,
+        overlay=args.profile_overlay,
+        governor=governor,
+        landmark_filter=OneEuroFilter(lookahead=args.lookahead_ms / 1000) if args.filter else None,
+        engine_factory=make_engine,
+        analog_mouse=AnalogMouse() if args.analog_mouse else None,
+        bus=bus
+    )
+
+    if args.headless:
+        # No window to press 'q' in, quit with Ctrl+C or SIGTERM instead
+        signal.signal(signal.SIGINT, session.request_stop)
+        signal.signal(signal.SIGTERM, session.request_stop)
+        print("Running headless, press Ctrl+C to quit")
+
+    if session.analog_mouse:
+        session.analog_mouse.start()
+
+    logging.info("using camera %s", ", ".join(f"{key} {value}" for key, value in camera_info.items()))
+    if args.startup_profile:
+        print(startup.report())
+
+    try:
+        if args.pipelined:
+            run_pipelined(cap, session, cpu_profile)
+        else:
+            run_serial(cap, session, cpu_profile)
+    finally:
+        if session.analog_mouse:
+            session.analog_mouse.stop()
+        session.engine.release_all()
+        if recorder:
+            recorder.close()
+        if bus:
+            bus.close()
+        if dispatcher:
+            dispatcher.close()
+            stats = dispatcher.stats()
+            print(
+                f"input: {stats['dispatched']} dispatched, {stats['coalesced']} coalesced, "
+                f"{stats['dropped']} dropped, max queue depth {stats['max_depth']}, "
+                f"latency mean {stats['mean_latency_ms']:.2f} ms / max {stats['max_latency_ms']:.2f} ms"
+            )
+        if pose_detector.motion_gate:
+            gate = pose_detector.motion_gate
+            print(f"motion gate: skipped inference on {gate.skipped} of {gate.frames} frames "
+                  f"({gate.skip_ratio:.0%})")
+        print("stage       p50    p95    p99")
+        print("\n".join(profiler.summary_lines()))
+        latency = event_log.latency_percentiles()
+        if latency:
+            print(f"motion-to-input {latency[0]:6.2f} {latency[1]:6.2f} {latency[2]:6.2f} ms")
+        if args.profile_out:
+            profiler.export(args.profile_out)
+            if profiler.first_kept_frame:
+                print(f"profile: only the last {profiler.frames - profiler.first_kept_frame} of "
+                      f"{profiler.frames} frames were kept, {args.profile_out} starts at frame {profiler.first_kept_frame}")
+        if args.events_out:
+            event_log.export(args.events_out)
 
     cap.release()
-    cv2.destroyAllWindows()
+    pose_detector.close()
+    if preview:
+        preview.close()
 
 
 if __name__ == "__main__":
@@ -1,187 +1,265 @@
-import time
-from config import last_action_time, previous_states, COOLDOWN
-from input_controller import handle_input_action
+from collections import namedtuple
+from functools import partial
+import numpy as np
+from config import COOLDOWN, HEAD_TILT_THRESHOLD, FLICK_SPEED, HOP_SPEED, COMBO_WINDOW
 from movement_utils import (
-    calculate_angle,
-    get_arm_vertical_position,
-    detect_knee_clap,
-    check_head_tilt
+    calculate_angles,
+    calculate_head_tilts,
+    vertical_offsets,
+    horizontal_distances,
+    speeds,
+    vertical_velocities
+)
+from pose_history import PoseHistory
+
+# A feature is a measurement taken from the landmark array:
+#   ("angle", a, b, c)  angle at b in degrees
+#   ("dy", a, b)        landmarks[a].y - landmarks[b].y, negative when a is above b
+#   ("dx_abs", a, b)    absolute x distance between a and b
+#   ("tilt", a, b)      angle of the line from a to b in degrees
+#   ("speed", a)        speed of a in normalized units per second, from the pose history
+#   ("vy", a)           y velocity of a per second, negative when moving up
+Term = namedtuple("Term", "feature op threshold")
+
+# trigger "edge": press once when the predicate becomes true, release when it becomes false
+# trigger "hold": press again every cooldown while the predicate stays true, never released
+# mode "all"/"any": whether every term or at least one term has to hold
+Gesture = namedtuple("Gesture", "name terms mode trigger cooldown")
+
+GESTURES = (
+    Gesture("left_arm_bend", (Term(("angle", 11, 13, 15), "<", 60), Term(("dy", 15, 11), ">", 0)),
+            "all", "edge", COOLDOWN),
+    Gesture("right_arm_bend", (Term(("angle", 12, 14, 16), "<", 60), Term(("dy", 16, 12), ">", 0)),
+            "all", "edge", COOLDOWN),
+    Gesture("tilt_left", (Term(("tilt", 4, 1), ">", HEAD_TILT_THRESHOLD),),
+            "all", "edge", COOLDOWN),
+    Gesture("tilt_right", (Term(("tilt", 4, 1), "<", -HEAD_TILT_THRESHOLD),),
+            "all", "edge", COOLDOWN),
+    Gesture("arm_raised", (Term(("dy", 15, 11), "<", 0), Term(("dy", 16, 12), "<", 0)),
+            "any", "edge", COOLDOWN),
+    Gesture("arm_lowered", (Term(("dy", 15, 11), ">=", 0), Term(("dy", 16, 12), ">=", 0)),
+            "any", "edge", COOLDOWN),
+    Gesture("jump", (Term(("dy", 26, 24), "<", 0),),
+            "all", "edge", 0.0),  # No cooldown for space bar (jump)
+    Gesture("left_knee_raise", (Term(("dy", 25, 23), "<", 0),),
+            "all", "edge", COOLDOWN),
+    Gesture("knee_clap", (Term(("dx_abs", 25, 26), "<", 0.05),),
+            "all", "hold", COOLDOWN),
+    # Motion gestures, these look at how fast joints move rather than where they are
+    Gesture("left_arm_flick", (Term(("speed", 15), ">", FLICK_SPEED),),
+            "all", "edge", COOLDOWN),
+    Gesture("right_arm_flick", (Term(("speed", 16), ">", FLICK_SPEED),),
+            "all", "edge", COOLDOWN),
+    Gesture("hop", (Term(("vy", 23), "<", -HOP_SPEED), Term(("vy", 24), "<", -HOP_SPEED)),
+            "all", "edge", 0.0),
 )
 
+# A combo fires (press and release at once) when its steps, gestures from
+# GESTURES, start in this order with all of them inside `window` seconds.
+# Steps do not need bindings of their own.
+Combo = namedtuple("Combo", "name steps window")
 
-def can_perform_action(action_name, current_time, bypass_cooldown=False):
-    """Check if enough time has passed to perform the action again"""
-    if bypass_cooldown:  # For space bar (jump)
-        return True
-    time_since_last = current_time - last_action_time[action_name]
-    return time_since_last >= COOLDOWN
-
+COMBOS = (
+    Combo("double_jump", ("hop", "hop"), COMBO_WINDOW),
+    Combo("double_flick", ("left_arm_flick", "right_arm_flick"), COMBO_WINDOW),
+)
 
-def handle_arm_movement(landmarks, side, keybindings, toggles):
-    """Handle arm bend detection and actions"""
-    try:
-        if not toggles.get(f"{side}_arm_bend", False):
+# op -> (sign, strict): the term holds when sign * (value - threshold) > 0, or >= 0 if not strict
+_OPS = {
+    "<": (-1.0, True),
+    "<=": (-1.0, False),
+    ">": (1.0, True),
+    ">=": (1.0, False),
+}
+
+_FEATURE_KINDS = ("angle", "dy", "dx_abs", "tilt", "speed", "vy")
+_HISTORY_KINDS = ("speed", "vy")
+
+
+def _resolve_actions(bindings, emit):
+    """(press, release) callables per binding, resolved now so a frame never parses a binding"""
+    if emit is None:
+        from input_controller import resolve_action
+        return [resolve_action(binding) for binding in bindings]
+    return [(partial(emit, binding, "press"), partial(emit, binding, "release")) for binding in bindings]
+
+
+class GestureEngine:
+    """Evaluates every enabled gesture in one vectorized pass per frame.
+
+    The gesture definitions are compiled once into flat index and threshold
+    arrays. Disabled gestures and the features only they use are left out, so
+    they cost nothing per frame. Input goes to emit(binding, action_type,
+    capture_time) when given, otherwise straight to the pynput actions from
+    input_controller. Cooldowns are measured between capture timestamps, so
+    they do not drift with inference time.
+
+    Motion features and combos read a PoseHistory, which is only kept when an
+    enabled gesture needs it. Combo matching keeps a step counter and a start
+    time per combo, so it costs the same every frame however long the history.
+    """
+
+    def __init__(self, keybindings, toggles, gestures=GESTURES, emit=None, combos=COMBOS):
+        by_name = {g.name: g for g in gestures}
+        enabled = [g for g in gestures if toggles.get(g.name, False) and g.name in keybindings]
+        combos = [c for c in combos if toggles.get(c.name, False) and c.name in keybindings]
+        self.bindings = [keybindings[g.name] for g in enabled]
+        self._actions = _resolve_actions(self.bindings, emit)
+        bound = len(enabled)
+
+        # Combo steps are evaluated even when they have no binding of their own
+        for combo in combos:
+            for step in combo.steps:
+                if by_name[step] not in enabled:
+                    enabled.append(by_name[step])
+        self.names = [g.name for g in enabled]
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self._bound = np.arange(len(enabled)) < bound
+
+        self.combo_names = [c.name for c in combos]
+        self._combo_actions = _resolve_actions([keybindings[c.name] for c in combos], emit)
+        self._combo_steps = [[self._index[step] for step in c.steps] for c in combos]
+        self._combo_window = [c.window for c in combos]
+        self._combo_progress = [0] * len(combos)  # Steps matched so far
+        self._combo_started = [0.0] * len(combos)  # When the first matched step happened
+
+        # Deduplicate features, grouped by kind so each kind is computed in one call
+        by_kind = {kind: [] for kind in _FEATURE_KINDS}
+        for gesture in enabled:
+            for term in gesture.terms:
+                kind, *indices = term.feature
+                if tuple(indices) not in by_kind[kind]:
+                    by_kind[kind].append(tuple(indices))
+
+        feature_slot = {}
+        self._feature_groups = []
+        offset = 0
+        for kind in _FEATURE_KINDS:
+            if not by_kind[kind]:
+                continue
+            for i, indices in enumerate(by_kind[kind]):
+                feature_slot[(kind, *indices)] = offset + i
+            count = len(by_kind[kind])
+            self._feature_groups.append((kind, np.array(by_kind[kind]), slice(offset, offset + count)))
+            offset += count
+        self._features = np.zeros(offset)
+        self.history = PoseHistory() if any(by_kind[kind] for kind in _HISTORY_KINDS) else None
+
+        # Flat term table, terms of a gesture are contiguous starting at _term_starts[i]
+        term_feature, term_sign, term_threshold, term_strict, starts = [], [], [], [], []
+        for gesture in enabled:
+            starts.append(len(term_feature))
+            for term in gesture.terms:
+                sign, strict = _OPS[term.op]
+                term_feature.append(feature_slot[term.feature])
+                term_sign.append(sign)
+                term_threshold.append(term.threshold)
+                term_strict.append(strict)
+        self._term_feature = np.array(term_feature, dtype=np.intp)
+        self._term_sign = np.array(term_sign)
+        self._term_threshold = np.array(term_threshold)
+        self._term_strict = np.array(term_strict, dtype=bool)
+        self._term_starts = np.array(starts, dtype=np.intp)
+
+        self._mode_any = np.array([g.mode == "any" for g in enabled], dtype=bool)
+        self._hold = np.array([g.trigger == "hold" for g in enabled], dtype=bool)
+        self._cooldown = np.array([g.cooldown for g in enabled])
+
+        # Per-gesture state
+        self.active = np.zeros(len(enabled), dtype=bool)
+        self.last_action_time = np.full(len(enabled), -np.inf)
+
+    def is_enabled(self, name):
+        """Whether the named gesture is on and bound, combo steps evaluated only for their combo are not"""
+        i = self._index.get(name)
+        return i is not None and bool(self._bound[i])
+
+    def is_active(self, name):
+        """Whether the named gesture held on the last evaluated frame"""
+        i = self._index.get(name)
+        return i is not None and bool(self.active[i])
+
+    def _compute_features(self, landmarks):
+        features = self._features
+        for kind, indices, span in self._feature_groups:
+            if kind == "angle":
+                features[span] = calculate_angles(landmarks, indices)
+            elif kind == "dy":
+                features[span] = vertical_offsets(landmarks, indices)
+            elif kind == "dx_abs":
+                features[span] = horizontal_distances(landmarks, indices)
+            elif kind == "tilt":
+                features[span] = calculate_head_tilts(landmarks, indices)
+            elif kind == "speed":
+                features[span] = speeds(self.history.velocity, indices[:, 0])
+            else:
+                features[span] = vertical_velocities(self.history.velocity, indices[:, 0])
+        return features
+
+    def evaluate(self, landmarks):
+        """Which enabled gestures hold for these landmarks, without touching state.
+
+        Motion features use the history as of the last update().
+        """
+        if not self.names:
+            return self.active.copy()
+
+        features = self._compute_features(landmarks)
+        diff = self._term_sign * (features[self._term_feature] - self._term_threshold)
+        terms_ok = (diff > 0) | (~self._term_strict & (diff == 0))
+        all_ok = np.logical_and.reduceat(terms_ok, self._term_starts)
+        any_ok = np.logical_or.reduceat(terms_ok, self._term_starts)
+        return np.where(self._mode_any, any_ok, all_ok)
+
+    def update(self, landmarks, current_time):
+        """Evaluate all gestures for one frame and emit the resulting input actions.
+
+        current_time is the frame's capture timestamp from time.perf_counter().
+        """
+        if not self.names:
             return
 
-        shoulder_idx = 11 if side == "left" else 12
-        elbow_idx = 13 if side == "left" else 14
-        wrist_idx = 15 if side == "left" else 16
-
-        shoulder = [landmarks[shoulder_idx].x, landmarks[shoulder_idx].y]
-        elbow = [landmarks[elbow_idx].x, landmarks[elbow_idx].y]
-        wrist = [landmarks[wrist_idx].x, landmarks[wrist_idx].y]
-
-        arm_angle = calculate_angle(shoulder, elbow, wrist)
-        is_bent = arm_angle < 60 and landmarks[wrist_idx].y > landmarks[shoulder_idx].y
-        was_bent = previous_states[f"{side}_arm_bend"]
-        current_time = time.time()
-
-        if is_bent and not was_bent and can_perform_action(f"{side}_arm_bend", current_time):
-            handle_input_action(keybindings[f"{side}_arm_bend"], "press")
-            last_action_time[f"{side}_arm_bend"] = current_time
-        elif not is_bent and was_bent:
-            handle_input_action(keybindings[f"{side}_arm_bend"], "release")
-
-        previous_states[f"{side}_arm_bend"] = is_bent
-
-    except (AttributeError, IndexError):
-        pass
-
-
-def handle_head_tilt(landmarks, keybindings, toggles, neutral_angle, current_time):
-    """Handle head tilt detection and actions"""
-    try:
-        neutral_angle, tilt_status = check_head_tilt(landmarks, neutral_angle)
-        was_tilted_left = previous_states["tilt_left"]
-        was_tilted_right = previous_states["tilt_right"]
-
-        if tilt_status == "tiltLeft" and not was_tilted_left:
-            if toggles.get("tilt_left", False) and can_perform_action("tilt_left", current_time):
-                handle_input_action(keybindings["tilt_left"], "press")
-                last_action_time["tilt_left"] = current_time
-        elif tilt_status == "tiltRight" and not was_tilted_right:
-            if toggles.get("tilt_right", False) and can_perform_action("tilt_right", current_time):
-                handle_input_action(keybindings["tilt_right"], "press")
-                last_action_time["tilt_right"] = current_time
-        elif tilt_status == "tiltCenter":
-            if was_tilted_left:
-                handle_input_action(keybindings["tilt_left"], "release")
-            if was_tilted_right:
-                handle_input_action(keybindings["tilt_right"], "release")
-
-        previous_states["tilt_left"] = (tilt_status == "tiltLeft")
-        previous_states["tilt_right"] = (tilt_status == "tiltRight")
-
-        return neutral_angle, tilt_status
-    except (AttributeError, IndexError):
-        return neutral_angle, "tiltCenter"
-
-
-def handle_vertical_movements(landmarks, keybindings, toggles, current_time):
-    """Handle arm raised and lowered positions"""
-    try:
-        left_shoulder = landmarks[11]
-        left_wrist = landmarks[15]
-        right_shoulder = landmarks[12]
-        right_wrist = landmarks[16]
-
-        # Handle arm raised
-        if toggles.get("arm_raised", False):
-            is_raised = (
-                    get_arm_vertical_position(left_shoulder, left_wrist) or
-                    get_arm_vertical_position(right_shoulder, right_wrist)
-            )
-            was_raised = previous_states["arm_raised"]
-
-            if is_raised and not was_raised and can_perform_action("arm_raised", current_time):
-                handle_input_action(keybindings["arm_raised"], "press")
-                last_action_time["arm_raised"] = current_time
-            elif not is_raised and was_raised:
-                handle_input_action(keybindings["arm_raised"], "release")
-
-            previous_states["arm_raised"] = is_raised
-
-        # Handle arm lowered
-        if toggles.get("arm_lowered", False):
-            is_lowered = (
-                    not get_arm_vertical_position(left_shoulder, left_wrist) or
-                    not get_arm_vertical_position(right_shoulder, right_wrist)
-            )
-            was_lowered = previous_states["arm_lowered"]
-
-            if is_lowered and not was_lowered and can_perform_action("arm_lowered", current_time):
-                handle_input_action(keybindings["arm_lowered"], "press")
-                last_action_time["arm_lowered"] = current_time
-            elif not is_lowered and was_lowered:
-                handle_input_action(keybindings["arm_lowered"], "release")
-
-            previous_states["arm_lowered"] = is_lowered
-
-    except (AttributeError, IndexError):
-        pass
-
-
-def handle_jump(landmarks, keybindings, toggles, current_time):
-    """Handle jump detection"""
-    if not toggles.get("jump", False):
-        return False
-
-    try:
-        right_hip_y = landmarks[24].y
-        right_knee_y = landmarks[26].y
-
-        is_jumping = right_knee_y < right_hip_y
-        was_jumping = previous_states["jump"]
-
-        if is_jumping and not was_jumping and can_perform_action("jump", current_time, bypass_cooldown=True):
-            handle_input_action(keybindings["jump"], "press")
-            last_action_time["jump"] = current_time
-        elif not is_jumping and was_jumping:
-            handle_input_action(keybindings["jump"], "release")
-
-        previous_states["jump"] = is_jumping
-        return is_jumping
-
-    except (AttributeError, IndexError):
-        return False
-
-
-def handle_left_knee_raise(landmarks, keybindings, toggles, current_time):
-    """Handle left knee raise detection"""
-    if not toggles.get("left_knee_raise", False):  # Update toggle name
-        return False
-
-    try:
-        left_hip_y = landmarks[23].y
-        left_knee_y = landmarks[25].y
-
-        is_raised = left_knee_y < left_hip_y  # Same logic as jump but for left side
-        was_raised = previous_states["left_knee_raise"]  # Update state name
-
-        if is_raised and not was_raised and can_perform_action("left_knee_raise", current_time):  # Update action name
-            handle_input_action(keybindings["left_knee_raise"], "press")  # Update keybinding name
-            last_action_time["left_knee_raise"] = current_time  # Update action name
-        elif not is_raised and was_raised:
-            handle_input_action(keybindings["left_knee_raise"], "release")  # Update keybinding name
-
-        previous_states["left_knee_raise"] = is_raised  # Update state name
-        return is_raised
-
-    except (AttributeError, IndexError):
-        return False
-
-
-def handle_knee_clap(landmarks, keybindings, toggles, current_time):
-    """Handle knee clap detection"""
-    if not toggles.get("knee_clap", False):
-        return False
-
-    try:
-        if detect_knee_clap(landmarks) and can_perform_action("knee_clap", current_time):
-            handle_input_action(keybindings["knee_clap"], "press")
-            last_action_time["knee_clap"] = current_time
-            return True
-    except (AttributeError, IndexError):
-        pass
-
-    return False
+        if self.history is not None:
+            self.history.push(landmarks, current_time)
+        is_active = self.evaluate(landmarks)
+        ready = current_time - self.last_action_time >= self._cooldown
+        press = is_active & ready & (self._hold | ~self.active) & self._bound
+        release = ~is_active & self.active & ~self._hold & self._bound
+
+        for i in np.flatnonzero(press | release):
+            if press[i]:
+                self._actions[i][0](current_time)
+                self.last_action_time[i] = current_time
+            else:
+                self._actions[i][1](current_time)
+
+        if self.combo_names:
+            self._match_combos(is_active & ~self.active, current_time)
+        self.active[:] = is_active
+
+    def _match_combos(self, started, current_time):
+        """Advance every combo whose next step started this frame, fire the completed ones"""
+        progress = self._combo_progress
+        for c, steps in enumerate(self._combo_steps):
+            if progress[c] and current_time - self._combo_started[c] > self._combo_window[c]:
+                progress[c] = 0  # Too slow, start over
+            if started[steps[progress[c]]]:
+                if progress[c] == 0:
+                    self._combo_started[c] = current_time
+                progress[c] += 1
+            elif progress[c] and started[steps[0]]:
+                # Wrong step, but it may begin the combo again
+                self._combo_started[c] = current_time
+                progress[c] = 1
+            if progress[c] == len(steps):
+                progress[c] = 0
+                press, release = self._combo_actions[c]
+                press(current_time)
+                release(current_time)
+
+    def release_all(self, current_time=None):
+        """Release every gesture that is currently held"""
+        for i in np.flatnonzero(self.active & ~self._hold & self._bound):
+            self._actions[i][1](current_time)
+        self.active[:] = False
+        self._combo_progress[:] = [0] * len(self._combo_progress)
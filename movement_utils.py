@@ -1,42 +1,56 @@
 import math
-from config import HEAD_TILT_THRESHOLD
-
-def calculate_angle(a, b, c):
-    """Calculate angle between three points"""
-    radians = math.atan2(c[1] - b[1], c[0] - b[0]) - math.atan2(a[1] - b[1], a[0] - b[0])
-    angle = abs(radians * 180.0 / math.pi)
-    return angle if angle <= 180 else 360 - angle
+import numpy as np
+
+NUM_LANDMARKS = 33  # MediaPipe Pose landmark count
+LANDMARK_FIELDS = 4  # x, y, z, visibility
+
+# Landmark rows are (x, y, z, visibility)
+X, Y, Z, VISIBILITY = 0, 1, 2, 3
+
+def calculate_angles(landmarks, joints):
+    """Calculate the angle at b for every (a, b, c) landmark index triplet in one pass"""
+    a = landmarks[joints[:, 0]]
+    b = landmarks[joints[:, 1]]
+    c = landmarks[joints[:, 2]]
+    radians = (
+        np.arctan2(c[:, Y] - b[:, Y], c[:, X] - b[:, X]) -
+        np.arctan2(a[:, Y] - b[:, Y], a[:, X] - b[:, X])
+    )
+    angles = np.abs(np.degrees(radians))
+    return np.where(angles <= 180, angles, 360 - angles)
 
 def calculate_head_tilt(landmarks):
     """Calculate head tilt angle"""
     left_ear = landmarks[4]  # Left ear (landmark index 4)
     right_ear = landmarks[1]  # Right ear (landmark index 1)
 
-    delta_y = right_ear.y - left_ear.y
-    delta_x = right_ear.x - left_ear.x
+    delta_y = right_ear[Y] - left_ear[Y]
+    delta_x = right_ear[X] - left_ear[X]
 
     angle_radians = math.atan2(delta_y, delta_x)
     angle_degrees = math.degrees(angle_radians)
 
     return angle_degrees
 
-def check_head_tilt(landmarks, neutral_angle):
-    """Check head tilt direction"""
-    angle_difference = calculate_head_tilt(landmarks)
-    if abs(angle_difference) > HEAD_TILT_THRESHOLD:
-        if angle_difference > 0:
-            return neutral_angle, "tiltLeft"
-        elif angle_difference < 0:
-            return neutral_angle, "tiltRight"
-    return neutral_angle, "tiltCenter"
-
-def get_arm_vertical_position(shoulder, wrist):
-    """Check if arm is raised above shoulder"""
-    return wrist.y < shoulder.y
-
-def detect_knee_clap(landmarks):
-    """Detect when knees come close together"""
-    left_knee = landmarks[25]
-    right_knee = landmarks[26]
-    knee_distance = abs(left_knee.x - right_knee.x)
-    return knee_distance < 0.05
\ No newline at end of file
+def calculate_head_tilts(landmarks, pairs):
+    """Calculate the tilt angle of the line from a to b for every (a, b) index pair"""
+    a = landmarks[pairs[:, 0]]
+    b = landmarks[pairs[:, 1]]
+    return np.degrees(np.arctan2(b[:, Y] - a[:, Y], b[:, X] - a[:, X]))
+
+def vertical_offsets(landmarks, pairs):
+    """Signed y distance from b to a for every (a, b) index pair, negative when a is above b"""
+    return landmarks[pairs[:, 0], Y] - landmarks[pairs[:, 1], Y]
+
+def horizontal_distances(landmarks, pairs):
+    """Absolute x distance for every (a, b) index pair"""
+    return np.abs(landmarks[pairs[:, 0], X] - landmarks[pairs[:, 1], X])
+
+def speeds(velocity, indices):
+    """Speed of every landmark in indices from a (33, 2) x/y velocity array"""
+    v = velocity[indices]
+    return np.hypot(v[:, X], v[:, Y])
+
+def vertical_velocities(velocity, indices):
+    """y velocity of every landmark in indices, negative when moving up"""
+    return velocity[indices, Y]
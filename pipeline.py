@@ -0,0 +1,188 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+from cpu_budget import pin_thread
+
+
+class LatestFrameSlot:
+    """Hand-off between two stages where a newer item replaces an unread one"""
+
+    def __init__(self, on_drop=None):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.on_drop = on_drop  # Called with each item that is overwritten, e.g. to recycle its frame
+        self.dropped = 0  # Items overwritten before the consumer took them
+
+    def put(self, item):
+        """Publish an item, dropping the previous one if it was never taken"""
+        with self._cond:
+            dropped, self._item = self._item, item
+            if dropped is not None:
+                self.dropped += 1
+            self._cond.notify()
+        if dropped is not None and self.on_drop:
+            self.on_drop(dropped)
+
+    def get(self, timeout=None):
+        """Take the newest item, waiting up to timeout seconds; None if nothing arrived"""
+        with self._cond:
+            if self._item is None and not self._closed:
+                self._cond.wait(timeout)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        """Wake up any waiting consumer so it can notice shutdown"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class FramePool:
+    """Recycles frame buffers so capture does not allocate a new frame every read"""
+
+    def __init__(self):
+        self._free = deque()
+        self._lock = threading.Lock()
+        self.allocated = 0  # Buffers ever created, stays flat once the pool has warmed up
+
+    def acquire(self, shape):
+        with self._lock:
+            while self._free:
+                buffer = self._free.pop()
+                if buffer.shape == shape:
+                    return buffer
+            self.allocated += 1
+        return np.empty(shape, dtype=np.uint8)
+
+    def release(self, buffer):
+        if buffer is not None:
+            with self._lock:
+                self._free.append(buffer)
+
+
+class FramePacket:
+    """A captured frame travelling through the pipeline, capture_time is from time.perf_counter()"""
+    __slots__ = ("frame_id", "frame", "capture_time", "landmarks")
+
+    def __init__(self, frame_id, frame, capture_time):
+        self.frame_id = frame_id
+        self.frame = frame
+        self.capture_time = capture_time
+        self.landmarks = None
+
+
+class CaptureStage(threading.Thread):
+    """Reads the camera as fast as it delivers and keeps only the newest frame.
+
+    cap is a capture.Camera, frames are read into buffers from pool and go
+    back to it once dispatched or dropped.
+    """
+
+    def __init__(self, cap, output, stop_event, pool, profiler=None, cores=None):
+        super().__init__(name="capture", daemon=True)
+        self.cores = cores  # CPUs to pin this thread to, see cpu_budget.CpuProfile
+        self.cap = cap
+        self.output = output
+        self.stop_event = stop_event
+        self.pool = pool
+        self.profiler = profiler
+        self.frames = 0
+
+    def run(self):
+        pin_thread(self.cores)
+        profiler = self.profiler
+        pool = self.pool
+        while not self.stop_event.is_set() and self.cap.isOpened():
+            start = profiler.start() if profiler else 0
+            buffer = pool.acquire(self.cap.shape) if self.cap.shape else None
+            ret, frame = self.cap.read(buffer)
+            if frame is not buffer:
+                pool.release(buffer)  # Not filled, e.g. the first frame
+            if not ret:
+                break
+            if profiler:
+                profiler.record("read", start)
+            self.output.put(FramePacket(self.frames, frame, time.perf_counter()))
+            self.frames += 1
+        self.stop_event.set()
+        self.output.close()
+
+
+class InferenceStage(threading.Thread):
+    """Runs pose detection on the freshest captured frame"""
+
+    def __init__(self, pose_detector, source, output, stop_event, cores=None):
+        super().__init__(name="inference", daemon=True)
+        self.cores = cores
+        self.pose_detector = pose_detector
+        self.source = source
+        self.output = output
+        self.stop_event = stop_event
+        self.frames = 0
+
+    def run(self):
+        pin_thread(self.cores)
+        while not self.stop_event.is_set():
+            packet = self.source.get(timeout=0.1)
+            if packet is None:
+                continue
+            landmarks = self.pose_detector.process_frame(packet.frame)
+            # The detector reuses its landmark array, so the packet needs its own copy
+            packet.landmarks = None if landmarks is None else landmarks.copy()
+            self.output.put(packet)
+            self.frames += 1
+        self.output.close()
+
+
+class PosePipeline:
+    """Capture -> inference -> dispatch pipeline with latest-frame-wins hand-offs.
+
+    Capture and inference run on their own threads. Dispatch (gesture evaluation,
+    input and the preview window) stays on the caller's thread, since HighGUI
+    must be driven from the main thread on some platforms.
+    """
+
+    def __init__(self, cap, pose_detector, profiler=None, capture_cores=None, inference_cores=None):
+        self.stop_event = threading.Event()
+        # A handful of frame buffers cycle between the stages instead of one allocation per frame
+        self.pool = FramePool()
+        self.captured = LatestFrameSlot(on_drop=self._recycle)
+        self.inferred = LatestFrameSlot(on_drop=self._recycle)
+        self.capture = CaptureStage(cap, self.captured, self.stop_event, self.pool, profiler, capture_cores)
+        self.inference = InferenceStage(pose_detector, self.captured, self.inferred, self.stop_event, inference_cores)
+        self.dispatched = 0
+
+    def _recycle(self, packet):
+        self.pool.release(packet.frame)
+
+    def start(self):
+        self.capture.start()
+        self.inference.start()
+
+    def packets(self):
+        """Yield inferred frames in order, skipping any that went stale"""
+        while not self.stop_event.is_set():
+            packet = self.inferred.get(timeout=0.1)
+            if packet is None:
+                continue
+            yield packet
+            self.dispatched += 1
+            self._recycle(packet)
+
+    def stop(self):
+        self.stop_event.set()
+        self.captured.close()
+        self.inferred.close()
+        self.capture.join(timeout=1.0)
+        self.inference.join(timeout=1.0)
+
+    def stats(self):
+        """Frames handled and dropped by each stage"""
+        return {
+            "capture": {"frames": self.capture.frames, "dropped": self.captured.dropped},
+            "inference": {"frames": self.inference.frames, "dropped": self.inferred.dropped},
+            "dispatch": {"frames": self.dispatched, "dropped": 0},
+        }
@@ -1,34 +1,445 @@
+import threading
+import time
 import cv2
 import mediapipe as mp
+import numpy as np
+from config import (
+    INFERENCE_SIZE,
+    ROI_PADDING,
+    POSE_BACKEND,
+    POSE_MODEL,
+    POSE_MODEL_FILES,
+    MOTION_THRESHOLD,
+    MOTION_REFRESH_FRAMES
+)
+from movement_utils import NUM_LANDMARKS, LANDMARK_FIELDS, X, Y, Z, VISIBILITY
+
+ROI_MIN_VISIBLE = 8  # Landmarks that must be visible to trust a bounding box
+ROI_MAX_COVERAGE = 0.8  # Crops covering more of the frame than this are not worth it
+
+# Pose() model_complexity for each model name, the Tasks backend loads POSE_MODEL_FILES[name]
+MODEL_COMPLEXITY = {"lite": 0, "full": 1, "heavy": 2}
+
+# Skeleton edges between landmark indices, the same for both backends
+POSE_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8), (9, 10),
+    (11, 12), (11, 13), (13, 15), (15, 17), (15, 19), (15, 21), (17, 19),
+    (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20),
+    (11, 23), (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28),
+    (27, 29), (28, 30), (29, 31), (30, 32), (27, 31), (28, 32),
+)
+
+
+def landmarks_to_array(landmark_list, out):
+    """Copy a MediaPipe landmark list into a preallocated (33, 4) array"""
+    for i, landmark in enumerate(landmark_list):
+        row = out[i]
+        row[0] = landmark.x
+        row[1] = landmark.y
+        row[2] = landmark.z
+        row[3] = landmark.visibility
+    return out
+
+
+class SolutionsBackend:
+    """Legacy mp.solutions.pose.Pose, every detect() call blocks until its frame is done.
+
+    Backends take Pose()-style settings (model_complexity, smooth_landmarks,
+    min_detection_confidence, min_tracking_confidence). detect(image, context)
+    returns (landmark list or None, context, seconds of inference) for the
+    newest finished frame, or None when no frame finished since the last call.
+    context is handed back untouched so the caller knows how that frame was cropped.
+    poll() returns the same without submitting a frame.
+    """
+
+    def __init__(self, **settings):
+        self.pose = mp.solutions.pose.Pose(**settings)
+
+    def detect(self, image, context):
+        started_at = time.perf_counter()
+        results = self.pose.process(image)
+        landmark_list = results.pose_landmarks.landmark if results.pose_landmarks else None
+        return landmark_list, context, time.perf_counter() - started_at
+
+    def poll(self):
+        return None  # detect() already returned every frame it was given
+
+    def warm_up(self, image):
+        self.pose.process(image)
+
+    def reconfigure(self, **settings):
+        self.pose.close()
+        self.pose = mp.solutions.pose.Pose(**settings)
+
+    def close(self):
+        self.pose.close()
+
+
+class TasksBackend:
+    """MediaPipe Tasks PoseLandmarker in LIVE_STREAM mode.
+
+    detect() queues the frame with detect_async and returns at once with the
+    newest result the callback has delivered, so inference of one frame
+    overlaps with capturing and converting the next. Results are therefore a
+    frame or so behind. MediaPipe drops frames that arrive while it is busy.
+    """
+
+    def __init__(self, **settings):
+        from mediapipe.tasks import python as mp_tasks
+        from mediapipe.tasks.python import vision
+
+        self._tasks = mp_tasks
+        self._vision = vision
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._contexts = {}  # timestamp_ms -> (context, submitted at) for frames in flight
+        self._result = None
+        self._timestamp_ms = 0
+        self.settings = {}
+        self.landmarker = None
+        self.reconfigure(**settings)
+
+    def reconfigure(self, **settings):
+        self.settings.update(settings)
+        model = next(name for name, level in MODEL_COMPLEXITY.items()
+                     if level == self.settings.get("model_complexity", 1))
+        options = self._vision.PoseLandmarkerOptions(
+            base_options=self._tasks.BaseOptions(model_asset_path=POSE_MODEL_FILES[model]),
+            running_mode=self._vision.RunningMode.LIVE_STREAM,
+            num_poses=1,
+            min_pose_detection_confidence=self.settings.get("min_detection_confidence", 0.5),
+            min_tracking_confidence=self.settings.get("min_tracking_confidence", 0.5),
+            result_callback=self._on_result
+        )
+        # smooth_landmarks has no Tasks equivalent, the landmarker always smooths in LIVE_STREAM mode
+        if self.landmarker:
+            self.landmarker.close()
+        with self._lock:
+            self._contexts.clear()
+            self._result = None
+        self.landmarker = self._vision.PoseLandmarker.create_from_options(options)
+
+    def _on_result(self, result, output_image, timestamp_ms):
+        """Runs on a MediaPipe thread"""
+        done_at = time.perf_counter()
+        with self._lock:
+            entry = self._contexts.pop(timestamp_ms, None)
+            # Frames queued before this one were dropped by MediaPipe
+            for stale in [ts for ts in self._contexts if ts < timestamp_ms]:
+                del self._contexts[stale]
+            if entry is None:
+                return
+            context, submitted_at = entry
+            if context is not None:  # None marks the warm-up frame, which may finish after warm_up gave up
+                landmark_list = result.pose_landmarks[0] if result.pose_landmarks else None
+                self._result = (landmark_list, context, done_at - submitted_at)
+        self._done.set()
+
+    def _submit(self, image, context):
+        # detect_async needs strictly increasing millisecond timestamps
+        self._timestamp_ms = max(self._timestamp_ms + 1, int(time.perf_counter() * 1000))
+        with self._lock:
+            self._contexts[self._timestamp_ms] = (context, time.perf_counter())
+        # mp.Image copies the pixels, so the caller may reuse its buffer right away
+        self.landmarker.detect_async(mp.Image(image_format=mp.ImageFormat.SRGB, data=image), self._timestamp_ms)
+
+    def detect(self, image, context):
+        self._submit(image, context)
+        return self.poll()
+
+    def poll(self):
+        with self._lock:
+            result, self._result = self._result, None
+        return result
+
+    def warm_up(self, image, timeout=5.0):
+        self._done.clear()
+        self._submit(image, None)
+        self._done.wait(timeout)
+
+    def close(self):
+        self.landmarker.close()
+
+
+BACKENDS = {"solutions": SolutionsBackend, "tasks": TasksBackend}
+
+
+class MotionGate:
+    """Tells whether a frame changed enough since the last inferred one to be worth inferring.
+
+    Frames are shrunk to a tiny grayscale thumbnail, which averages away
+    sensor noise, and compared with the thumbnail of the last frame that was
+    inferred. The largest per-pixel difference, in gray levels, has to reach
+    threshold. Every refresh_interval skipped frames inference runs anyway, so
+    a slow drift is never missed for long.
+    """
+
+    def __init__(self, threshold=MOTION_THRESHOLD, refresh_interval=MOTION_REFRESH_FRAMES, size=(32, 24)):
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+        self.size = size
+        self._small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self._thumbnail = np.empty((size[1], size[0]), dtype=np.uint8)
+        self._diff = np.empty_like(self._thumbnail)
+        self._reference = np.empty_like(self._thumbnail)
+        self._has_reference = False
+        self._since_inference = 0
+        self.frames = 0
+        self.skipped = 0
+        self.last_difference = 0
+
+    def reset(self):
+        """Forget the reference so the next frame is inferred"""
+        self._has_reference = False
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def should_infer(self, frame):
+        self.frames += 1
+        cv2.resize(frame, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._thumbnail)
+
+        if self._has_reference and self._since_inference < self.refresh_interval:
+            cv2.absdiff(self._thumbnail, self._reference, dst=self._diff)
+            self.last_difference = int(self._diff.max())
+            if self.last_difference < self.threshold:
+                self._since_inference += 1
+                self.skipped += 1
+                return False
+
+        self._reference[...] = self._thumbnail
+        self._has_reference = True
+        self._since_inference = 0
+        return True
+
 
 class PoseDetector:
-    def __init__(self):
-        self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose()
-        self.mp_drawing = mp.solutions.drawing_utils
+    """Runs MediaPipe pose estimation on camera frames.
+
+    Once the player has been found, only a padded box around them (the ROI) is
+    converted and given to the model, downscaled so its longest side is
+    target_size. Landmarks are always returned in full-frame normalized
+    coordinates. Losing the player falls back to the whole frame. backend
+    picks one of BACKENDS and model one of MODEL_COMPLEXITY. An optional
+    MotionGate skips inference on frames where nothing moved. region, an
+    (x0, y0, x1, y1) box in normalized coordinates, limits the search to part
+    of the frame, the ROI then stays inside it.
+    """
+
+    def __init__(self, profiler=None, roi_padding=ROI_PADDING, target_size=INFERENCE_SIZE,
+                 backend=POSE_BACKEND, model=POSE_MODEL, motion_gate=None, region=None):
+        self.backend_name = backend
+        self.model = model
+        self.pose_settings = {"model_complexity": MODEL_COMPLEXITY[model]}
+        self.backend = BACKENDS[backend](**self.pose_settings)
+        # Reused every frame, callers that keep landmarks across frames must copy them
+        self.landmarks = np.zeros((NUM_LANDMARKS, LANDMARK_FIELDS), dtype=np.float32)
+        self.profiler = profiler  # Optional StageProfiler timing convert/inference
+        self.roi_padding = roi_padding  # None disables ROI cropping
+        self.target_size = target_size
+        self.roi = None  # (x0, y0, x1, y1) in pixels, None for the full frame or region
+        self.region = region
+        self.frame_skip = 0  # Frames reusing the last landmarks after each inferred one
+        self.motion_gate = motion_gate
+        self.fresh = False  # Whether the last process_frame call returned a newly inferred result
+        self.last_inference_time = 0.0  # Seconds spent converting and inferring the last result
+        self.frames = 0  # process_frame calls so far
+        self.result_frame = -1  # Which call's frame the returned landmarks came from
+        self._skipped = 0
+        self._last_result = None
+        self._pending_settings = None
+        self._buffers = {}  # Scratch images reused while the crop size stays the same
+
+    def _buffer(self, name, shape):
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = self._buffers[name] = np.empty(shape, dtype=np.uint8)
+        return buffer
+
+    def warm_up(self, width=640, height=480):
+        """Run one inference on a blank frame so the first camera frame does not pay for graph setup"""
+        self.backend.warm_up(np.zeros((height, width, 3), dtype=np.uint8))
+
+    def configure(self, frame_skip=0, **pose_settings):
+        """Change frame skipping and Pose() settings such as model_complexity.
+
+        The change is applied by whichever thread calls process_frame, right
+        before its next frame, so it is safe to call from another thread.
+        """
+        self._pending_settings = (frame_skip, pose_settings)
+
+    def _apply_settings(self):
+        self.frame_skip, pose_settings = self._pending_settings
+        self._pending_settings = None
+        pose_settings = dict(self.pose_settings, **pose_settings)
+        if pose_settings == self.pose_settings:
+            return  # Only frame skipping changed, the model and its tracking state stay
+        self.pose_settings = pose_settings
+        self.backend.reconfigure(**pose_settings)
+        self.roi = None
+        self._last_result = None
+        if self.motion_gate:
+            self.motion_gate.reset()
+
+    def close(self):
+        self.backend.close()
 
     def process_frame(self, frame):
-        """Process a frame and return pose landmarks"""
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.pose.process(frame_rgb)
-        
-        if results.pose_landmarks:
-            self.mp_drawing.draw_landmarks(
-                frame, 
-                results.pose_landmarks, 
-                self.mp_pose.POSE_CONNECTIONS
+        """Process a frame and return the (33, 4) landmark array, or None if no pose was found.
+
+        With an asynchronous backend the landmarks may come from an earlier
+        frame, result_frame says which one.
+        """
+        if self._pending_settings is not None:
+            self._apply_settings()
+
+        frame_id = self.frames
+        self.frames += 1
+        if self._skipped < self.frame_skip:
+            self._skipped += 1
+            return self._poll()
+        self._skipped = 0
+
+        profiler = self.profiler
+        started_at = time.perf_counter()
+        start = profiler.start() if profiler else 0
+
+        if self.motion_gate and not self.motion_gate.should_infer(frame):
+            # Nothing moved, the previous landmarks (and so the gesture state) still hold
+            if profiler:
+                profiler.record("convert", start)
+            return self._poll()
+
+        frame_height, frame_width = frame.shape[:2]
+        bounds = self._region_box(frame_width, frame_height)
+        roi = self.roi or bounds
+        image = frame[roi[1]:roi[3], roi[0]:roi[2]] if roi else frame
+        height, width = image.shape[:2]
+
+        # Downscale before converting so cvtColor touches as few pixels as possible.
+        # Both write into reused buffers, so a steady crop allocates no images.
+        if self.target_size and max(height, width) > self.target_size:
+            scale = self.target_size / max(height, width)
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            image = cv2.resize(
+                image,
+                size,
+                dst=self._buffer("small", (size[1], size[0], 3)),
+                interpolation=cv2.INTER_AREA
             )
-            
-        return results
+        frame_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self._buffer("rgb", image.shape))
+        convert_time = time.perf_counter() - started_at
+        if profiler:
+            start = profiler.record("convert", start)
+
+        result = self.backend.detect(frame_rgb, (frame_id, roi, width, height, frame_width, frame_height))
+        if result is None:
+            # Nothing finished since the last frame, keep returning the previous result
+            if profiler:
+                profiler.record("inference", start)
+            self.fresh = False
+            self.last_inference_time = 0.0
+            return self._last_result
+        landmarks = self._take_result(result, convert_time)
+        if profiler:
+            profiler.record("inference", start)
+        return landmarks
+
+    def _poll(self):
+        """Result for a frame that is not inferred: one an asynchronous backend finished since, else the last one.
+
+        Frames submitted before the skip or gate still come out on time
+        instead of waiting for the next inferred frame.
+        """
+        result = self.backend.poll()
+        if result is None:
+            self.fresh = False
+            self.last_inference_time = 0.0
+            return self._last_result
+        return self._take_result(result, 0.0)
+
+    def _take_result(self, result, convert_time):
+        """Turn a backend result into full-frame landmarks and make it the current one"""
+        landmark_list, (frame_id, roi, width, height, frame_width, frame_height), inference_time = result
+        landmarks = None
+        if landmark_list:
+            landmarks = landmarks_to_array(landmark_list, self.landmarks)
+            if roi:
+                # Map from crop-normalized back to full-frame-normalized coordinates
+                landmarks[:, X] = (roi[0] + landmarks[:, X] * width) / frame_width
+                landmarks[:, Y] = (roi[1] + landmarks[:, Y] * height) / frame_height
+                landmarks[:, Z] *= width / frame_width
+        self.last_inference_time = convert_time + inference_time
+        self.fresh = True
+        self.result_frame = frame_id
+
+        if self.roi_padding is not None:
+            self.roi = self._next_roi(landmarks, frame_width, frame_height,
+                                      self._region_box(frame_width, frame_height))
+        self._last_result = landmarks
+        return landmarks
+
+    def _region_box(self, frame_width, frame_height):
+        """region in pixels, None when there is none"""
+        region = self.region
+        if region is None:
+            return None
+        return (int(region[0] * frame_width), int(region[1] * frame_height),
+                int(region[2] * frame_width), int(region[3] * frame_height))
+
+    def _next_roi(self, landmarks, frame_width, frame_height, bounds=None):
+        """Padded box around the visible landmarks inside bounds, None to search all of bounds"""
+        if landmarks is None:
+            return None
+        visible = landmarks[landmarks[:, VISIBILITY] > 0.5]
+        if len(visible) < ROI_MIN_VISIBLE:
+            return None
+
+        x_min, y_min = visible[:, X].min(), visible[:, Y].min()
+        x_max, y_max = visible[:, X].max(), visible[:, Y].max()
+        pad_x = (x_max - x_min) * self.roi_padding
+        pad_y = (y_max - y_min) * self.roi_padding
+        left, top, right, bottom = bounds or (0, 0, frame_width, frame_height)
+        x0 = max(left, int((x_min - pad_x) * frame_width))
+        y0 = max(top, int((y_min - pad_y) * frame_height))
+        x1 = min(right, int((x_max + pad_x) * frame_width))
+        y1 = min(bottom, int((y_max + pad_y) * frame_height))
+        if x1 <= x0 or y1 <= y0:
+            return None
+        area = (x1 - x0) * (y1 - y0)
+        if area > ROI_MAX_COVERAGE * (right - left) * (bottom - top):
+            return None
+
+        # Keep the current crop while the player stays inside it, MediaPipe tracks
+        # the pose between frames and works best on a stable image
+        roi = self.roi
+        if roi and roi[0] <= x0 and roi[1] <= y0 and x1 <= roi[2] and y1 <= roi[3]:
+            if area >= 0.5 * (roi[2] - roi[0]) * (roi[3] - roi[1]):
+                return roi
+        return x0, y0, x1, y1
+
+    def draw_landmarks(self, image, landmarks, min_visibility=0.5):
+        """Draw the skeleton from a landmark array, works on frames of any size"""
+        height, width = image.shape[:2]
+        points = (landmarks[:, :2] * (width, height)).astype(np.int32).tolist()
+        visible = landmarks[:, 3] >= min_visibility
+
+        for a, b in POSE_CONNECTIONS:
+            if visible[a] and visible[b]:
+                cv2.line(image, points[a], points[b], (245, 245, 245), 2)
+        for i in np.flatnonzero(visible):
+            cv2.circle(image, points[i], 3, (0, 0, 255), -1)
 
-    def draw_status(self, frame, text, position=(10, 50)):
+    def draw_status(self, frame, text, position=(10, 50), scale=1, thickness=2):
         """Draw status text on frame"""
         cv2.putText(
             frame,
             text,
             position,
             cv2.FONT_HERSHEY_SIMPLEX,
-            1,
+            scale,
             (0, 255, 0),
-            2
-        )
\ No newline at end of file
+            thickness
+        )
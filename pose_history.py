@@ -0,0 +1,84 @@
+import numpy as np
+from config import HISTORY_FRAMES, VELOCITY_CUTOFF
+from filters import MAX_GAP, smoothing_factor
+from movement_utils import NUM_LANDMARKS, LANDMARK_FIELDS
+
+
+class PoseHistory:
+    """The last `size` landmark frames with their timestamps, plus per-joint velocity and acceleration.
+
+    Frames live in one preallocated (size, 33, 4) array used as a ring, and
+    velocity and acceleration of x and y (normalized units per second, and
+    per second squared) are updated incrementally from the newest two frames
+    and low-pass filtered at VELOCITY_CUTOFF Hz. push() costs the same
+    whatever the size and allocates nothing. A gap longer than MAX_GAP starts
+    the history over so a returning player does not show up as a huge velocity.
+    Frames repeating the newest one, as skipped or motion-gated frames do,
+    count as standing still at their own timestamp, so the velocity decays
+    while the pose holds and the next real frame is measured over one frame.
+    """
+
+    def __init__(self, size=HISTORY_FRAMES, cutoff=VELOCITY_CUTOFF):
+        self.size = size
+        self.cutoff = cutoff
+        self.frames = np.zeros((size, NUM_LANDMARKS, LANDMARK_FIELDS), dtype=np.float32)
+        self.times = np.zeros(size)
+        self.velocity = np.zeros((NUM_LANDMARKS, 2))
+        self.acceleration = np.zeros((NUM_LANDMARKS, 2))
+        self.count = 0  # Frames pushed since the last reset
+        self._xy = self.frames[:, :, :2]
+        self._delta = np.zeros((NUM_LANDMARKS, 2))
+        self._previous_velocity = np.zeros((NUM_LANDMARKS, 2))
+        self._changed = np.zeros((NUM_LANDMARKS, LANDMARK_FIELDS), dtype=bool)
+
+    def reset(self):
+        self.count = 0
+        self.velocity[...] = 0
+        self.acceleration[...] = 0
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def latest(self, age=0):
+        """(landmarks, time) of the frame `age` frames back, 0 being the newest"""
+        if age >= len(self):
+            raise IndexError(f"only {len(self)} frames of history")
+        i = (self.count - 1 - age) % self.size
+        return self.frames[i], self.times[i]
+
+    def push(self, landmarks, timestamp):
+        """Add a frame, returns False when it repeated the newest one or came out of order"""
+        moved = True
+        if self.count:
+            newest = (self.count - 1) % self.size
+            np.not_equal(landmarks, self.frames[newest], out=self._changed)
+            moved = bool(self._changed.any())
+            dt = timestamp - self.times[newest]
+            if dt <= 0:
+                return False
+            if dt > MAX_GAP:
+                self.reset()
+
+        i = self.count % self.size
+        self.frames[i] = landmarks
+        self.times[i] = timestamp
+        self.count += 1
+        if self.count == 1:
+            return True
+
+        # Raw velocity from the newest two frames, then low-passed like the One Euro filter's
+        alpha = smoothing_factor(self.cutoff, dt)
+        # Zero for a repeated frame, the pose held still since the newest one
+        np.subtract(self._xy[i], self._xy[newest], out=self._delta)
+        self._delta /= dt
+        self._previous_velocity[...] = self.velocity
+        self._delta -= self.velocity
+        self._delta *= alpha
+        self.velocity += self._delta
+        if self.count > 2:
+            np.subtract(self.velocity, self._previous_velocity, out=self._delta)
+            self._delta /= dt
+            self._delta -= self.acceleration
+            self._delta *= alpha
+            self.acceleration += self._delta
+        return moved
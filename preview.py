@@ -0,0 +1,61 @@
+import time
+import cv2
+
+
+class PreviewRenderer:
+    """Shows the camera preview, optionally at a capped rate on a downscaled copy.
+
+    Callers check due() first, frames arriving sooner than 1 / max_fps after the
+    last shown one are skipped without drawing anything, so rendering takes no
+    time away from inference.
+    """
+
+    def __init__(self, pose_detector, max_fps=0, scale=1.0, window_name="MediaPipe Pose", profiler=None):
+        self.pose_detector = pose_detector
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.scale = scale
+        self.window_name = window_name
+        self.profiler = profiler
+        self.rendered = 0
+        self.skipped = 0
+        self._last_render = 0.0
+
+    def due(self):
+        """Whether enough time has passed to show another frame, counts the frame as skipped if not"""
+        now = time.perf_counter()
+        if now - self._last_render < self.min_interval:
+            self.skipped += 1
+            return False
+        self._last_render = now
+        return True
+
+    def render(self, frame, landmarks, status_lines=(), overlay_lines=()):
+        """Draw and show the frame, returns False once the user asked to quit"""
+        profiler = self.profiler
+        start = profiler.start() if profiler else 0
+
+        if self.scale != 1.0:
+            image = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        else:
+            image = frame
+
+        if landmarks is not None:
+            self.pose_detector.draw_landmarks(image, landmarks)
+        for i, line in enumerate(status_lines):
+            self.pose_detector.draw_status(image, line, (10, 50 + 35 * i))
+        top = 50 + 35 * len(status_lines)
+        for i, line in enumerate(overlay_lines):
+            self.pose_detector.draw_status(image, line, (10, top + 22 * i), scale=0.5, thickness=1)
+        if profiler:
+            start = profiler.record("draw", start)
+
+        cv2.imshow(self.window_name, image)
+        keep_running = not (cv2.waitKey(1) & 0xFF == ord('q'))
+        if profiler:
+            profiler.record("display", start)
+
+        self.rendered += 1
+        return keep_running
+
+    def close(self):
+        cv2.destroyWindow(self.window_name)
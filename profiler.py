@@ -0,0 +1,124 @@
+import csv
+import json
+import time
+import numpy as np
+
+STAGES = ("read", "convert", "inference", "draw", "gestures", "input", "display", "frame")
+
+
+class StageProfiler:
+    """Per-stage frame timings with rolling percentiles, cheap enough to leave on.
+
+    Call start() for a timestamp, record(stage, start) after the stage ran and
+    end_frame() once per frame. Times of a stage that runs several times in a
+    frame are summed. The last `window` frames of each stage feed the
+    percentiles; per-frame rows are only kept when history is non-zero, as a
+    ring of the last `history` frames.
+    In pipelined mode stages run on different threads, so a row may mix
+    timings from neighbouring frames.
+    """
+
+    def __init__(self, stages=STAGES, window=512, history=0):
+        self.stages = stages
+        self.window = window
+        self._slot = {stage: i for i, stage in enumerate(stages)}
+        self._current = [0] * len(stages)
+        self._touched = [False] * len(stages)
+        self._samples = np.zeros((len(stages), window), dtype=np.int64)
+        self._counts = [0] * len(stages)
+        self._history = np.zeros((history, len(stages)), dtype=np.int64) if history else None
+        self.frames = 0
+
+    @staticmethod
+    def start():
+        return time.perf_counter_ns()
+
+    def record(self, stage, start):
+        """Add the time since start to stage, returns the end timestamp so stages can be chained"""
+        end = time.perf_counter_ns()
+        i = self._slot[stage]
+        self._current[i] += end - start
+        self._touched[i] = True
+        return end
+
+    def timed(self, stage, func):
+        """Wrap func so every call is recorded under stage"""
+        def timed_func(*args):
+            start = time.perf_counter_ns()
+            result = func(*args)
+            self.record(stage, start)
+            return result
+        return timed_func
+
+    def end_frame(self):
+        """Push this frame's stage times into the rolling windows and start a new frame"""
+        current = self._current
+        for i, touched in enumerate(self._touched):
+            if touched:
+                self._samples[i, self._counts[i] % self.window] = current[i]
+                self._counts[i] += 1
+
+        if self._history is not None:
+            self._history[self.frames % len(self._history)] = current
+
+        self.frames += 1
+        self._current = [0] * len(self.stages)
+        self._touched = [False] * len(self.stages)
+
+    def percentiles(self, stage):
+        """(p50, p95, p99) in milliseconds over the rolling window, None before any sample"""
+        i = self._slot[stage]
+        count = min(self._counts[i], self.window)
+        if count == 0:
+            return None
+        p50, p95, p99 = np.percentile(self._samples[i, :count], (50, 95, 99)) / 1e6
+        return p50, p95, p99
+
+    def summary_lines(self):
+        """One 'stage p50/p95/p99' line per stage that has samples"""
+        lines = []
+        for stage in self.stages:
+            result = self.percentiles(stage)
+            if result is not None:
+                lines.append(f"{stage:<9} {result[0]:6.2f} {result[1]:6.2f} {result[2]:6.2f} ms")
+        return lines
+
+    @property
+    def first_kept_frame(self):
+        """Number of the oldest frame still in the history, frames before it were overwritten"""
+        if self._history is None:
+            return self.frames
+        return max(0, self.frames - len(self._history))
+
+    def export(self, path):
+        """Write per-frame timings in milliseconds as CSV, or as JSON when path ends in .json.
+
+        Only the frames still in the history are written, numbered from the
+        start of the session, so a gap at the start shows what was cut off.
+        """
+        first = self.first_kept_frame
+        rows = []
+        if self._history is not None:
+            # Oldest first, the ring may have wrapped around
+            order = np.arange(first, self.frames) % len(self._history)
+            rows = self._history[order] / 1e6
+
+        if path.endswith(".json"):
+            summary = {}
+            for stage in self.stages:
+                result = self.percentiles(stage)
+                if result is not None:
+                    summary[stage] = dict(zip(("p50", "p95", "p99"), result))
+            with open(path, 'w') as f:
+                json.dump({
+                    "stages": list(self.stages),
+                    "summary_ms": summary,
+                    "first_frame": first,
+                    "frames_ms": [list(row) for row in np.round(rows, 4).tolist()],
+                }, f)
+        else:
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(("frame",) + tuple(f"{stage}_ms" for stage in self.stages))
+                for i, row in enumerate(rows, first):
+                    writer.writerow([i] + [f"{value:.4f}" for value in row])
@@ -0,0 +1,69 @@
+import os
+import struct
+import numpy as np
+from movement_utils import NUM_LANDMARKS, LANDMARK_FIELDS
+
+# File layout: a 16 byte header followed by fixed-size little-endian records,
+# so a recording can be memory-mapped as one structured array.
+MAGIC = b"KKLM"
+VERSION = 1
+HEADER = struct.Struct("<4sHHH6x")
+
+RECORD_DTYPE = np.dtype([
+    ("time", "<f8"),  # Capture timestamp in seconds
+    ("valid", "u1"),  # 0 when no pose was found in the frame
+    ("landmarks", "<f4", (NUM_LANDMARKS, LANDMARK_FIELDS)),
+])
+
+
+class LandmarkRecorder:
+    """Appends one record per frame to a landmark recording file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.frames = 0
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, NUM_LANDMARKS, LANDMARK_FIELDS))
+        self._record = np.zeros(1, dtype=RECORD_DTYPE)
+
+    def write(self, landmarks, capture_time):
+        """Record one frame, landmarks may be None when no pose was detected"""
+        record = self._record[0]
+        record["time"] = capture_time
+        if landmarks is None:
+            record["valid"] = 0
+            record["landmarks"] = 0
+        else:
+            record["valid"] = 1
+            record["landmarks"] = landmarks
+        self._file.write(self._record.tobytes())
+        self.frames += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_recording(path):
+    """Memory-map a recording as a structured array with time, valid and landmarks fields"""
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f"{path} is not a landmark recording")
+
+    magic, version, num_landmarks, fields = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a landmark recording")
+    if version != VERSION or (num_landmarks, fields) != (NUM_LANDMARKS, LANDMARK_FIELDS):
+        raise ValueError(f"{path} uses an unsupported recording format (version {version})")
+
+    # A recording cut short by a crash may end in a partial record, ignore it
+    count = (os.path.getsize(path) - HEADER.size) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER.size, shape=(count,))
@@ -0,0 +1,80 @@
+import argparse
+import json
+import sys
+import time
+from config import load_keybindings, load_toggles
+from movement_handlers import GestureEngine
+from filters import OneEuroFilter
+from recording import load_recording
+
+
+class EventSink:
+    """Stands in for input_controller and records every emitted input action with its capture time"""
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, action_key, action_type, capture_time=None):
+        self.events.append([capture_time, action_key, action_type])
+
+
+def replay(recording, keybindings, toggles, landmark_filter=None):
+    """Stream a recording through the gesture engine, returns (events, seconds spent in the engine)"""
+    sink = EventSink()
+    engine = GestureEngine(keybindings, toggles, emit=sink)
+    elapsed = 0.0
+
+    capture_time = None
+    for record in recording:
+        capture_time = float(record["time"])
+        landmarks = record["landmarks"] if record["valid"] else None
+        start = time.perf_counter()
+        if landmark_filter:
+            landmarks = landmark_filter(landmarks, capture_time)
+        if landmarks is not None:
+            engine.update(landmarks, capture_time)
+        elapsed += time.perf_counter() - start
+
+    engine.release_all(capture_time)
+    return sink.events, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a landmark recording through the gesture engine")
+    parser.add_argument("recording", help="file written by main.py --record")
+    parser.add_argument("--filter", action="store_true", help="smooth landmarks like main.py --filter")
+    parser.add_argument("--lookahead-ms", type=float, default=0, metavar="MS", help="prediction for --filter")
+    parser.add_argument("--dump-events", metavar="PATH", help="write the emitted events as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="fail if the events differ from a previous dump")
+    args = parser.parse_args()
+
+    recording = load_recording(args.recording)
+    landmark_filter = OneEuroFilter(lookahead=args.lookahead_ms / 1000) if args.filter else None
+    events, elapsed = replay(recording, load_keybindings(), load_toggles(), landmark_filter)
+
+    frames = int(recording["valid"].sum()) if len(recording) else 0
+    print(f"{len(recording)} frames ({frames} with a pose), {len(events)} events")
+    if frames and elapsed > 0:
+        stage = "filtering and gesture evaluation" if landmark_filter else "gesture evaluation"
+        print(f"{stage}: {elapsed / frames * 1e6:.1f} us/frame, {frames / elapsed:.0f} frames/s")
+
+    if args.dump_events:
+        with open(args.dump_events, 'w') as f:
+            json.dump(events, f, indent=1)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            expected = json.load(f)
+        if expected != events:
+            for i, (got, want) in enumerate(zip(events, expected)):
+                if got != want:
+                    print(f"first difference at event {i}: got {got}, expected {want}")
+                    break
+            else:
+                print(f"event count differs: got {len(events)}, expected {len(expected)}")
+            sys.exit(1)
+        print("events match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from config import CAMERA_CACHE_FILE, CAMERA_PROBE_LIMIT
+
+
+class StartupProfiler:
+    """Records when each startup phase ran and on which thread"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases = []  # (name, thread name, start, end) in seconds since origin
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter() - self.origin
+        try:
+            yield
+        finally:
+            end = time.perf_counter() - self.origin
+            with self._lock:
+                self.phases.append((name, threading.current_thread().name, start, end))
+
+    def report(self):
+        """Timeline of the phases, overlapping ones ran in parallel"""
+        lines = [f"{'phase':<22} {'thread':<12} {'start':>8} {'took':>8}"]
+        for name, thread, start, end in sorted(self.phases, key=lambda phase: phase[2]):
+            lines.append(f"{name:<22} {thread:<12} {start * 1000:6.0f}ms {(end - start) * 1000:6.0f}ms")
+        total = max((end for *_, end in self.phases), default=0.0)
+        lines.append(f"ready after {total * 1000:.0f} ms")
+        return "\n".join(lines)
+
+
+def load_camera_cache(path=CAMERA_CACHE_FILE):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def save_camera_cache(info, path=CAMERA_CACHE_FILE):
+    try:
+        with open(path, 'w') as f:
+            json.dump(info, f, indent=4)
+    except OSError:
+        pass  # Only costs the next start a probe
+
+
+def _try_camera(cv2, index):
+    """Open and configure a camera and read one frame, returns the Camera or None"""
+    from capture import Camera
+
+    cap = cv2.VideoCapture(index)
+    if not cap.isOpened():
+        cap.release()
+        return None
+    camera = Camera(cap)
+    camera.configure()
+    ret, _ = camera.read()
+    if not ret:
+        camera.release()
+        return None
+    return camera
+
+
+def open_camera(index=None, cache_path=CAMERA_CACHE_FILE):
+    """Open a working camera, returns (camera, info).
+
+    The camera is a capture.Camera already asked for the CAPTURE_* format,
+    info holds its index and the settings it actually negotiated. An explicit
+    index is used as is. Otherwise the camera that worked last time is tried
+    first, then indices 0 to CAMERA_PROBE_LIMIT - 1. Whatever works is cached
+    for the next start.
+    """
+    import cv2
+    from capture import Camera
+
+    if index is not None:
+        camera = Camera(cv2.VideoCapture(index))
+        if not camera.isOpened():
+            return camera, {"index": index}
+        camera.configure()
+        return camera, {"index": index, **camera.settings()}
+
+    cached = load_camera_cache(cache_path)
+    candidates = []
+    if cached and "index" in cached:
+        candidates.append(cached["index"])
+    candidates += [i for i in range(CAMERA_PROBE_LIMIT) if not cached or i != cached.get("index")]
+
+    for candidate in candidates:
+        camera = _try_camera(cv2, candidate)
+        if camera is None:
+            continue
+        info = {"index": candidate, **camera.settings()}
+        if info != cached:
+            save_camera_cache(info, cache_path)
+        return camera, info
+
+    raise RuntimeError(f"no working camera found at indices 0-{CAMERA_PROBE_LIMIT - 1}, pass --camera")
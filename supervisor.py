@@ -0,0 +1,136 @@
+import argparse
+import json
+import multiprocessing as mp
+import queue
+import signal
+import time
+from config import KEYBINDINGS_FILE, TOGGLES_FILE
+
+# players.json lists one entry per player, e.g.
+# [
+#     {"name": "left", "camera": 0, "keybindings": "keybindings_left.json", "toggles": "toggles_left.json"},
+#     {"name": "right", "camera": 1, "keybindings": "keybindings_right.json", "toggles": "toggles_right.json"}
+# ]
+# "region": [x0, y0, x1, y1] in normalized coordinates limits a player to part
+# of the camera image, so two players can share one camera. Each camera gets
+# its own worker process, players sharing a camera are handled by the same one.
+
+
+def load_players(path):
+    """Load player definitions, grouped by camera index"""
+    with open(path, 'r') as f:
+        players = json.load(f)
+
+    by_camera = {}
+    for i, player in enumerate(players):
+        player.setdefault("name", f"player{i + 1}")
+        player.setdefault("camera", 0)
+        player.setdefault("keybindings", KEYBINDINGS_FILE)
+        player.setdefault("toggles", TOGGLES_FILE)
+        player.setdefault("region", None)
+        by_camera.setdefault(player["camera"], []).append(player)
+    return by_camera
+
+
+def run_worker(camera, players, events, stop_event):
+    """Worker process: one camera, and a detector and gesture engine of its own for each player on it"""
+    # Imported here so the supervisor process never loads OpenCV or MediaPipe
+    import cv2
+    from capture import Camera
+    from config import load_keybindings, load_toggles
+    from movement_handlers import GestureEngine
+    from pose_detection import PoseDetector
+
+    # The supervisor handles Ctrl+C and tells workers to stop through stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    slots = []
+    for player in players:
+        name = player["name"]
+        keybindings = load_keybindings(player["keybindings"])
+        toggles = load_toggles(player["toggles"], player["keybindings"])
+
+        def emit(action_key, action_type, capture_time=None, name=name):
+            events.put((name, action_key, action_type, capture_time))
+
+        # A region is cropped by the detector, which hands back full-frame coordinates as the gestures expect
+        slots.append((PoseDetector(region=player["region"]), GestureEngine(keybindings, toggles, emit=emit)))
+
+    cap = Camera(cv2.VideoCapture(camera))
+    cap.configure()
+    try:
+        while not stop_event.is_set() and cap.isOpened():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            capture_time = time.perf_counter()
+
+            for pose_detector, engine in slots:
+                landmarks = pose_detector.process_frame(frame)
+                if landmarks is not None:
+                    engine.update(landmarks, capture_time)
+    finally:
+        for _, engine in slots:
+            engine.release_all()
+        cap.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run one pose worker process per camera, all feeding one input dispatcher"
+    )
+    parser.add_argument(
+        "players",
+        nargs="?",
+        default="players.json",
+        help="player definitions (default: players.json)"
+    )
+    args = parser.parse_args()
+
+    from input_controller import InputDispatcher
+
+    by_camera = load_players(args.players)
+    events = mp.Queue()
+    stop_event = mp.Event()
+    workers = [
+        mp.Process(target=run_worker, args=(camera, players, events, stop_event), name=f"camera{camera}", daemon=True)
+        for camera, players in by_camera.items()
+    ]
+    for worker in workers:
+        worker.start()
+    for camera, players in by_camera.items():
+        print(f"camera {camera}: {', '.join(player['name'] for player in players)}")
+    print("Press Ctrl+C to quit")
+
+    dispatcher = InputDispatcher()
+    counts = {player["name"]: 0 for players in by_camera.values() for player in players}
+    try:
+        while any(worker.is_alive() for worker in workers):
+            try:
+                name, action_key, action_type, capture_time = events.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            dispatcher(action_key, action_type, capture_time)
+            counts[name] += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join(timeout=2.0)
+
+        # Deliver the releases the workers sent on their way out
+        while True:
+            try:
+                _, action_key, action_type, capture_time = events.get_nowait()
+            except queue.Empty:
+                break
+            dispatcher(action_key, action_type, capture_time)
+        dispatcher.close()
+
+    for name, count in counts.items():
+        print(f"{name}: {count} input actions")
+
+
+if __name__ == "__main__":
+    main()